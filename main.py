@@ -15,12 +15,37 @@ import json
 import threading
 import multiprocessing
 import platform
+from queue import Empty
 from pathlib import Path
 
+# 优先使用libyaml提供的C解析器，不可用时回退到纯Python实现
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+# 程序所在目录和配置文件路径，启动时计算一次
+SCRIPT_PATH = os.path.abspath(__file__)
+BASE_DIR = os.path.dirname(SCRIPT_PATH)
+CONFIG_PATH = os.path.join(BASE_DIR, 'config.yaml')
+# 解析后配置的JSON缓存文件，配置文件未修改时跳过YAML解析和路径处理
+CONFIG_CACHE_PATH = os.path.join(BASE_DIR, 'logs', '.config.cache.json')
+CONFIG_CACHE_VERSION = 3  # 配置处理逻辑变化时递增，使旧缓存失效
+SCAN_MIN_THREADS = 8  # 自动设置线程数时扫描至少使用的线程数
+# 配置文件中必须存在的配置项，按配置节列出
+REQUIRED_CONFIG_KEYS = {
+    'scan': ('scan_paths', 'size_threshold', 'output_file'),
+    'migration': ('target_path', 'temp_path', 'mapping_file'),
+    'cleanup': ('retry_count', 'retry_interval'),
+    'link': ('check_timeout',),
+    'logging': ('log_file', 'log_level'),
+    'performance': ('max_threads',),
+}
+
 # 调整Python模块导入路径，确保能找到modules模块
 def adjust_import_path():
     """调整Python导入路径，确保能找到modules模块"""
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    current_dir = BASE_DIR
     
     # 检查当前目录下是否有modules目录（开发环境）
     if os.path.exists(os.path.join(current_dir, 'modules')):
@@ -37,7 +62,7 @@ def adjust_import_path():
 adjust_import_path()
 
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, \
-    QPushButton, QTextEdit, QLabel, QProgressBar, QMessageBox, QFileDialog
+    QPushButton, QPlainTextEdit, QLabel, QProgressBar, QMessageBox, QFileDialog
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize
 from PyQt5.QtGui import QIcon, QTextCursor
 
@@ -46,7 +71,49 @@ from modules.scanner import Scanner
 from modules.migrator import Migrator
 from modules.cleaner import Cleaner
 from modules.linker import Linker
-from modules.utils import is_admin, setup_logger, get_optimal_thread_count
+from modules.utils import is_admin, setup_logger, shutdown_logger, get_optimal_thread_count
+
+
+def _clean_entry(config, queue, stop_event):
+    """
+    在子进程中执行清理任务
+    
+    清理过程中的消息和进度通过队列发送回主进程，避免与界面线程竞争GIL
+    
+    Args:
+        config: 配置信息
+        queue: 消息队列，元素为 (类型, 值)，类型为 'update'、'progress' 或 'finished'
+        stop_event: 停止事件，由主进程设置
+    """
+    setup_logger(
+        log_file=config['logging']['log_file'],
+        log_level=config['logging']['log_level']
+    )
+    
+    cleaner = Cleaner(
+        mapping_file=config['migration']['mapping_file'],
+        retry_count=config['cleanup']['retry_count'],
+        retry_interval=config['cleanup']['retry_interval'],
+        max_threads=config['performance']['max_threads'],
+        update_callback=lambda msg: queue.put(('update', msg)),
+        progress_callback=lambda progress: queue.put(('progress', progress)),
+        retry_base_ms=config['cleanup'].get('retry_base_ms', 100)
+    )
+    
+    def watch_stop_event():
+        """等待停止事件并停止清理"""
+        stop_event.wait()
+        cleaner.stop()
+    
+    threading.Thread(target=watch_stop_event, daemon=True).start()
+    
+    success = False
+    try:
+        success = cleaner.clean()
+    finally:
+        # 子进程退出前写完剩余日志
+        shutdown_logger()
+        queue.put(('finished', success))
 
 
 class WorkerThread(QThread):
@@ -69,6 +136,8 @@ class WorkerThread(QThread):
         self.config = config
         self.logger = logging.getLogger('MigrateC')
         self.is_running = True
+        self._stop_event = None  # 子进程任务的停止事件
+        self._last_progress = -1  # 上次发送的进度，相同进度不重复发送
 
     def run(self):
         """运行线程"""
@@ -91,6 +160,18 @@ class WorkerThread(QThread):
             self.update_signal.emit(f"任务执行出错: {str(e)}")
             self.finished_signal.emit(False, f"任务执行出错: {str(e)}")
 
+    def _emit_progress(self, progress):
+        """
+        发送进度信号，进度取整后与上次相同时不发送，避免频繁的跨线程信号和界面刷新
+        
+        Args:
+            progress: 进度（0-100）
+        """
+        progress = int(progress)
+        if progress != self._last_progress:
+            self._last_progress = progress
+            self.progress_signal.emit(progress)
+
     def _run_scan(self):
         """运行扫描任务"""
         self.update_signal.emit("开始扫描大文件夹...")
@@ -100,9 +181,9 @@ class WorkerThread(QThread):
             scan_paths=self.config['scan']['scan_paths'],
             size_threshold=self.config['scan']['size_threshold'],
             output_file=self.config['scan']['output_file'],
-            max_threads=self.config['performance']['max_threads'],
-            update_callback=lambda msg: self.update_signal.emit(msg),
-            progress_callback=lambda progress: self.progress_signal.emit(progress),
+            max_threads=self.config['scan']['max_threads'],
+            update_callback=self.update_signal.emit,
+            progress_callback=self._emit_progress,
             exclude_folders=self.config['scan'].get('exclude_folders', [])
         )
         
@@ -133,8 +214,10 @@ class WorkerThread(QThread):
             temp_path=self.config['migration']['temp_path'],
             mapping_file=self.config['migration']['mapping_file'],
             max_threads=self.config['performance']['max_threads'],
-            update_callback=lambda msg: self.update_signal.emit(msg),
-            progress_callback=lambda progress: self.progress_signal.emit(progress)
+            update_callback=self.update_signal.emit,
+            progress_callback=self._emit_progress,
+            compress_level=self.config['migration'].get('compress_level', 0),
+            use_temp_archive=self.config['migration'].get('use_temp_archive', False)
         )
         
         # 执行迁移
@@ -157,17 +240,32 @@ class WorkerThread(QThread):
             self.finished_signal.emit(False, "映射文件不存在")
             return
         
-        # 创建清理器
-        cleaner = Cleaner(
-            mapping_file=self.config['migration']['mapping_file'],
-            retry_count=self.config['cleanup']['retry_count'],
-            retry_interval=self.config['cleanup']['retry_interval'],
-            update_callback=lambda msg: self.update_signal.emit(msg),
-            progress_callback=lambda progress: self.progress_signal.emit(progress)
-        )
+        # 在子进程中执行清理，本线程只负责转发消息和进度
+        queue = multiprocessing.Queue()
+        self._stop_event = multiprocessing.Event()
+        process = multiprocessing.Process(target=_clean_entry, args=(self.config, queue, self._stop_event), daemon=True)
+        process.start()
+        
+        success = False
+        while True:
+            try:
+                kind, value = queue.get(timeout=0.5)
+            except Empty:
+                # 子进程异常退出时不会发送完成消息
+                if not process.is_alive() and queue.empty():
+                    self.logger.error(f"清理子进程异常退出，退出码: {process.exitcode}")
+                    break
+                continue
+            
+            if kind == 'update':
+                self.update_signal.emit(value)
+            elif kind == 'progress':
+                self._emit_progress(value)
+            elif kind == 'finished':
+                success = value
+                break
         
-        # 执行清理
-        success = cleaner.clean()
+        process.join()
         
         if success:
             self.update_signal.emit("清理完成")
@@ -196,8 +294,9 @@ class WorkerThread(QThread):
         linker = Linker(
             mapping_file=self.config['migration']['mapping_file'],
             check_timeout=self.config['link']['check_timeout'],
-            update_callback=lambda msg: self.update_signal.emit(msg),
-            progress_callback=lambda progress: self.progress_signal.emit(progress)
+            update_callback=self.update_signal.emit,
+            progress_callback=self._emit_progress,
+            verify_links=self.config['link'].get('verify_links', False)
         )
         
         # 执行链接
@@ -234,6 +333,8 @@ class WorkerThread(QThread):
     def stop(self):
         """停止线程"""
         self.is_running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
 
 
 class MainWindow(QMainWindow):
@@ -265,50 +366,156 @@ class MainWindow(QMainWindow):
 
     def _load_config(self):
         """加载配置文件"""
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml')
-        
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                
-            # 处理用户名变量
-            for i, path_info in enumerate(config['scan']['scan_paths']):
-                if isinstance(path_info, dict) and 'path' in path_info:
-                    config['scan']['scan_paths'][i]['path'] = path_info['path'].replace('%USERNAME%', os.environ['USERNAME'])
-                elif isinstance(path_info, str):
-                    # 兼容旧格式
-                    config['scan']['scan_paths'][i] = {
-                        'path': path_info.replace('%USERNAME%', os.environ['USERNAME']),
-                        'max_depth': 3  # 默认深度
-                    }
-                
-            # 处理相对路径
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            for section in ['scan', 'migration', 'logging']:
-                for key in config[section]:
-                    if isinstance(config[section][key], str) and config[section][key].startswith('./'):
-                        config[section][key] = os.path.normpath(os.path.join(base_dir, config[section][key]))
+            # 配置文件和用户名都未变化时直接使用缓存的解析结果
+            cache_key = self._get_config_cache_key()
+            config = self._load_config_cache(cache_key)
+            if config is None:
+                # 只缓存校验通过并处理完路径的配置
+                config = self._parse_config()
+                self._resolve_config_paths(config)
+                self._save_config_cache(cache_key, config)
             
-            # 设置最大线程数
-            if config['performance']['max_threads'] == 0:
+            # 设置最大线程数，与运行环境有关，不放入缓存
+            auto_threads = config['performance']['max_threads'] == 0
+            if auto_threads:
                 config['performance']['max_threads'] = get_optimal_thread_count()
+            
+            # 扫描主要是读取目录和获取文件信息，等待I/O的时间多，自动设置时使用更多线程
+            if not config['scan'].get('max_threads'):
+                config['scan']['max_threads'] = (get_optimal_thread_count(min_threads=SCAN_MIN_THREADS) if auto_threads
+                                                 else config['performance']['max_threads'])
                 
             return config
         except Exception as e:
             print(f"加载配置文件失败: {str(e)}")
             sys.exit(1)
 
+    def _parse_config(self):
+        """
+        解析并校验配置文件，处理其中的用户名变量
+        
+        Returns:
+            dict: 配置信息
+            
+        Raises:
+            ValueError: 配置文件缺少必需的配置项
+        """
+        # 以二进制读取，由libyaml自行识别编码，省去Python侧的解码
+        with open(CONFIG_PATH, 'rb') as f:
+            config = yaml.load(f, Loader=YamlLoader)
+        
+        # 缺少配置项时在加载时报错，而不是在执行任务时才出错
+        missing = [f"{section}.{key}" for section, keys in REQUIRED_CONFIG_KEYS.items()
+                   for key in keys
+                   if not isinstance(config, dict) or not isinstance(config.get(section), dict) or key not in config[section]]
+        if missing:
+            raise ValueError(f"缺少配置项: {', '.join(missing)}")
+            
+        # 兼容旧格式，先把字符串形式的扫描路径统一转换为字典
+        scan_paths = config['scan']['scan_paths'] = [
+            {'path': path_info, 'max_depth': 3} if isinstance(path_info, str) else path_info  # 默认深度为3
+            for path_info in config['scan']['scan_paths']
+        ]
+        
+        # 处理用户名变量，只在路径包含变量时才读取环境变量并替换
+        username = None
+        for path_info in scan_paths:
+            path = path_info.get('path') if isinstance(path_info, dict) else None
+            if path and '%USERNAME%' in path:
+                if username is None:
+                    username = self._get_username()
+                path_info['path'] = path.replace('%USERNAME%', username)
+        
+        return config
+
+    def _resolve_config_paths(self, config):
+        """
+        将配置中以 ./ 开头的相对路径转换为基于程序所在目录的绝对路径
+        
+        Args:
+            config: 配置信息，原地修改
+        """
+        # 每个配置项只取一次值
+        for section in ('scan', 'migration', 'logging'):
+            section_config = config[section]
+            for key, value in section_config.items():
+                if type(value) is str and value[:2] == './':
+                    section_config[key] = os.path.normpath(os.path.join(BASE_DIR, value[2:]))
+
+    def _get_username(self):
+        """
+        获取当前用户名，USERNAME只在Windows上存在，其他平台依次尝试USER和getpass
+        
+        Returns:
+            str: 用户名
+        """
+        username = os.environ.get('USERNAME') or os.environ.get('USER')
+        if not username:
+            import getpass
+            username = getpass.getuser()
+        return username
+
+    def _get_config_cache_key(self):
+        """
+        计算配置缓存的键，配置文件修改或用户名变化时键随之变化
+        
+        Returns:
+            tuple: 缓存键
+        """
+        stat = os.stat(CONFIG_PATH)
+        return (CONFIG_CACHE_VERSION, stat.st_mtime_ns, stat.st_size,
+                os.environ.get('USERNAME', ''), os.environ.get('USER', ''), BASE_DIR)
+
+    def _load_config_cache(self, cache_key):
+        """
+        读取配置缓存
+        
+        Args:
+            cache_key: 缓存键
+            
+        Returns:
+            dict: 缓存的配置信息，缓存不存在或已失效时返回None
+        """
+        try:
+            with open(CONFIG_CACHE_PATH, 'rb') as f:
+                cache = json.load(f)
+            # JSON中没有元组，缓存键读回后为列表
+            if cache['key'] == list(cache_key):
+                return cache['config']
+        except Exception:
+            pass
+        return None
+
+    def _save_config_cache(self, cache_key, config):
+        """
+        保存配置缓存，保存失败不影响程序运行
+        
+        Args:
+            cache_key: 缓存键
+            config: 配置信息
+        """
+        try:
+            os.makedirs(os.path.dirname(CONFIG_CACHE_PATH), exist_ok=True)
+            temp_path = CONFIG_CACHE_PATH + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': cache_key, 'config': config}, f, ensure_ascii=False)
+            os.replace(temp_path, CONFIG_CACHE_PATH)
+        except Exception as e:
+            print(f"保存配置缓存失败: {str(e)}")
+
     def _create_directories(self):
         """创建必要的目录"""
-        directories = [
-            os.path.dirname(self.config['logging']['log_file']),
-            os.path.dirname(self.config['scan']['output_file']),
-            os.path.dirname(self.config['migration']['mapping_file']),
-            self.config['migration']['temp_path']
-        ]
+        # 扫描结果和映射文件通常在同一目录下，相同目录只创建一次
+        directories = {
+            Path(self.config['logging']['log_file']).parent,
+            Path(self.config['scan']['output_file']).parent,
+            Path(self.config['migration']['mapping_file']).parent,
+            Path(self.config['migration']['temp_path'])
+        }
         
         for directory in directories:
-            os.makedirs(directory, exist_ok=True)
+            directory.mkdir(parents=True, exist_ok=True)
 
     def _init_ui(self):
         """初始化UI"""
@@ -363,8 +570,10 @@ class MainWindow(QMainWindow):
         info_layout = QVBoxLayout(info_panel)
         
         # 日志显示区域
-        self.log_area = QTextEdit()
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
+        # 界面只保留最近的日志，完整日志记录在日志文件中
+        self.log_area.setMaximumBlockCount(5000)
         
         # 进度条
         progress_layout = QHBoxLayout()
@@ -392,7 +601,7 @@ class MainWindow(QMainWindow):
 
     def log_message(self, message):
         """记录消息到日志区域"""
-        self.log_area.append(message)
+        self.log_area.appendPlainText(message)
         # 滚动到底部
         self.log_area.moveCursor(QTextCursor.End)
         # 同时记录到日志文件
@@ -455,7 +664,7 @@ class MainWindow(QMainWindow):
 
     def _open_config(self):
         """打开配置文件"""
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml')
+        config_path = CONFIG_PATH
         
         # 检查配置文件是否存在，如果不存在则创建默认配置文件
         if not os.path.exists(config_path):
@@ -488,19 +697,24 @@ class MainWindow(QMainWindow):
                     ],
                     'size_threshold': 1073741824,  # 1GB
                     'exclude_folders': ["Windows", "System32", "ProgramData", "$Recycle.Bin", "Programs", "Microsoft"],
-                    'output_file': "./output/scan_results.json"
+                    'output_file': "./output/scan_results.json",
+                    'max_threads': 0  # 0表示自动确定
                 },
                 'migration': {
                     'target_path': "D:\\C_backup",
                     'temp_path': "./temp",
-                    'mapping_file': "./output/path_mapping.json"
+                    'mapping_file': "./output/path_mapping.json",
+                    'compress_level': 0,
+                    'use_temp_archive': False
                 },
                 'cleanup': {
                     'retry_count': 3,
-                    'retry_interval': 5
+                    'retry_interval': 5,
+                    'retry_base_ms': 100
                 },
                 'link': {
-                    'check_timeout': 10
+                    'check_timeout': 10,
+                    'verify_links': False
                 },
                 'logging': {
                     'log_file': "./logs/migrate.log",
@@ -527,14 +741,21 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == "__main__":
-    # 添加调试信息
-    print("C盘大文件迁移工具 - 主程序启动")
-    print(f"Python版本: {platform.python_version()}")
-    print(f"系统信息: {platform.platform()}")
-    print(f"当前工作目录: {os.getcwd()}")
-    print(f"脚本路径: {os.path.abspath(__file__)}")
-    print(f"命令行参数: {sys.argv}")
-    print(f"是否从启动器启动: {'MIGRATE_C_LAUNCHER' in os.environ}")
+    # 打包后的程序使用子进程时需要调用
+    multiprocessing.freeze_support()
+    
+    # 添加调试信息，合并为一次写入
+    # 打包为无控制台程序时sys.stdout为None，此时print不输出，这里同样跳过
+    if sys.stdout is not None:
+        sys.stdout.write('\n'.join([
+            "C盘大文件迁移工具 - 主程序启动",
+            f"Python版本: {platform.python_version()}",
+            f"系统信息: {platform.platform()}",
+            f"当前工作目录: {os.getcwd()}",
+            f"脚本路径: {SCRIPT_PATH}",
+            f"命令行参数: {sys.argv}",
+            f"是否从启动器启动: {'MIGRATE_C_LAUNCHER' in os.environ}",
+        ]) + '\n')
     
     # 确保只有一个QApplication实例
     app = QApplication.instance()
@@ -10,38 +10,79 @@
 import os
 import json
 import time
+import uuid
+import queue
 import shutil
+import stat
+import random
 import logging
+import threading
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 class Cleaner:
     """文件和文件夹清理器"""
     
-    def __init__(self, mapping_file, retry_count=3, retry_interval=5,
-                 update_callback=None, progress_callback=None):
+    PARALLEL_UNLINK_THRESHOLD = 1000  # 文件数超过该值时并行删除
+    UNLINK_BATCH_SIZE = 512  # 并行删除时每批提交的文件数
+    MAX_REPORTED_ERRORS = 10  # 并行删除出错时最多逐条记录的错误数
+    SCRATCH_MARKER = '.__mcdel_'  # 等待后台删除的文件夹重命名时添加的标记
+    MSG_BATCH_SIZE = 50  # 消息缓冲区最大条数
+    MSG_FLUSH_INTERVAL = 0.033  # 消息发送最小间隔（秒），约30Hz
+    
+    def __init__(self, mapping_file, retry_count=3, retry_interval=5, max_threads=4,
+                 update_callback=None, progress_callback=None, retry_base_ms=100):
         """
         初始化清理器
         
         Args:
             mapping_file: 映射文件路径
             retry_count: 重试次数
-            retry_interval: 重试间隔时间（秒）
+            retry_interval: 重试间隔时间（秒），作为指数退避等待时间的上限
+            max_threads: 最大线程数
             update_callback: 更新回调函数
             progress_callback: 进度回调函数
+            retry_base_ms: 首次重试的等待时间（毫秒），之后每次重试翻倍
         """
         self.mapping_file = mapping_file
         self.retry_count = retry_count
         self.retry_interval = retry_interval
+        self.retry_base_ms = retry_base_ms
+        self.max_threads = max_threads
         self.update_callback = update_callback
         self.progress_callback = progress_callback
         self.logger = logging.getLogger('MigrateC.Cleaner')
         self.path_mapping = {}  # 路径映射
+        self.type_mapping = {}  # 路径类型映射，值为 'file' 或 'folder'
         self.total_items = 0  # 总项目数（文件和文件夹）
         self.processed_items = 0  # 已处理项目数
-        self.is_running = True  # 运行标志
+        self._cancel = threading.Event()  # 取消事件，多线程下用于通知所有工作线程停止
         self.failed_items = []  # 删除失败的项目
+        self.lock = threading.Lock()  # 线程锁
+        self._msg_buf = []  # 待发送的消息缓冲区
+        self._buf_lock = threading.Lock()  # 消息缓冲区锁
+        self._last_flush = time.monotonic()  # 上次发送消息的时间
+        self._last_progress = -1  # 上次发送的进度
+        self._last_progress_time = 0.0  # 上次发送进度的时间
+        self._holders_cache = None  # 映射路径到占用进程列表的缓存，键为规范化后的源路径
+        self._holders_lock = threading.Lock()  # 占用进程缓存锁
+        self._delete_queue = queue.Queue()  # 等待后台删除的文件夹队列
+        self._delete_thread = None  # 后台删除线程
+        self._delete_thread_lock = threading.Lock()  # 后台删除线程启动锁
     
     def clean(self):
         """
@@ -63,29 +104,40 @@ class Cleaner:
             
             self._update(f"开始清理 {self.total_items} 个项目")
             
+            # 上次运行未删除完的临时文件夹，与本次的一起在后台删除
+            self._sweep_leftover_scratch()
+            
             # 更新进度
             if self.progress_callback:
                 self.progress_callback(0)
             
-            # 清理文件和文件夹
-            for source_path, target_path in self.path_mapping.items():
-                if not self.is_running:
-                    break
+            # 使用线程池并行清理文件和文件夹
+            # 线程数设置上限，避免机械硬盘因并发过高而频繁寻道
+            max_workers = max(1, min(32, self.max_threads, self.total_items))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self._clean_one, source_path, target_path)
+                           for source_path, target_path in self.path_mapping.items()]
                 
-                # 判断是文件还是文件夹
-                if os.path.isfile(source_path):
-                    self._clean_file(source_path, target_path)
-                else:
-                    self._clean_folder(source_path, target_path)
-                
-                # 更新进度
-                self.processed_items += 1
-                progress = int(self.processed_items / max(1, self.total_items) * 100)
-                if self.progress_callback and progress <= 100:
-                    self.progress_callback(progress)
+                for future in as_completed(futures):
+                    # 更新进度
+                    with self.lock:
+                        self.processed_items += 1
+                        progress = int(self.processed_items / max(1, self.total_items) * 100)
+                    
+                    # 进度只有100个不同的值，仅在进度变化且距上次发送超过最小间隔时发送，最后一项总是发送
+                    if self.progress_callback and progress <= 100 and progress != self._last_progress:
+                        now = time.monotonic()
+                        if now - self._last_progress_time >= self.MSG_FLUSH_INTERVAL or \
+                           self.processed_items == self.total_items:
+                            self.progress_callback(progress)
+                            self._last_progress = progress
+                            self._last_progress_time = now
+            
+            # 等待后台删除完成
+            self._wait_background_delete()
             
             # 输出结果
-            if self.is_running:
+            if not self._cancel.is_set():
                 if len(self.failed_items) == 0:
                     self._update(f"清理完成，所有文件和文件夹已成功删除")
                     if self.progress_callback:
@@ -104,6 +156,11 @@ class Cleaner:
             self.logger.exception(f"清理出错: {str(e)}")
             self._update(f"清理出错: {str(e)}")
             return False
+        finally:
+            # 后台删除线程为守护线程，异常退出时也需等待其完成，避免进程退出时遗留临时文件夹
+            self._wait_background_delete()
+            # 输出缓冲区中剩余的消息
+            self._flush_updates()
     
     def _load_mapping(self):
         """
@@ -113,15 +170,53 @@ class Cleaner:
             bool: 是否成功
         """
         try:
-            with open(self.mapping_file, 'r', encoding='utf-8') as f:
-                mapping_data = json.load(f)
-                self.path_mapping = mapping_data.get('path_mapping', {})
+            if ORJSON_AVAILABLE:
+                # orjson在C中解析，映射条目较多时明显快于标准库json
+                with open(self.mapping_file, 'rb') as f:
+                    mapping_data = orjson.loads(f.read())
+            else:
+                with open(self.mapping_file, 'r', encoding='utf-8') as f:
+                    mapping_data = json.load(f)
+            self.path_mapping = mapping_data.get('path_mapping', {})
+            # 旧版本生成的映射文件没有类型信息
+            self.type_mapping = mapping_data.get('type_mapping', {})
             return True
         except Exception as e:
             self.logger.exception(f"加载映射出错: {str(e)}")
             self._update(f"加载映射出错: {str(e)}")
             return False
     
+    def _clean_one(self, source_path, target_path):
+        """
+        清理单个项目，根据类型分派到文件或文件夹的清理方法
+        
+        Args:
+            source_path: 源路径（C盘路径）
+            target_path: 目标路径（D盘路径）
+        """
+        if self._cancel.is_set():
+            return
+        
+        # 判断是文件还是文件夹，优先使用映射文件中记录的类型，避免额外的stat调用
+        item_type = self.type_mapping.get(source_path)
+        if item_type is None:
+            item_type = 'file' if os.path.isfile(source_path) else 'folder'
+        
+        if item_type == 'file':
+            self._clean_file(source_path, target_path)
+        else:
+            self._clean_folder(source_path, target_path)
+    
+    def _add_failed_item(self, path):
+        """
+        记录删除失败的项目
+        
+        Args:
+            path: 删除失败的路径
+        """
+        with self.lock:
+            self.failed_items.append(path)
+    
     def _clean_file(self, source_path, target_path):
         """
         清理文件
@@ -131,32 +226,35 @@ class Cleaner:
             target_path: 目标路径（D盘路径）
         """
         try:
-            # 检查源路径是否存在
-            if not os.path.exists(source_path):
-                self._update(f"源文件不存在，跳过: {source_path}")
-                return
-            
-            # 检查目标路径是否存在
+            # 检查目标路径是否存在，目标不存在时不能删除源路径
+            # 源路径是否存在不做预先检查，由删除操作抛出的FileNotFoundError判断，减少一次stat调用
             if not os.path.exists(target_path):
+                if not os.path.lexists(source_path):
+                    self._update(f"源文件不存在，跳过: {source_path}")
+                    return
                 self._update(f"目标文件不存在，跳过: {source_path}")
-                self.failed_items.append(source_path)
+                self._add_failed_item(source_path)
                 return
             
             self._update(f"正在删除文件: {source_path}")
             
             # 尝试删除文件
-            success = self._remove_file_with_retry(source_path)
+            try:
+                success = self._remove_file_with_retry(source_path)
+            except FileNotFoundError:
+                self._update(f"源文件不存在，跳过: {source_path}")
+                return
             
             if success:
                 self._update(f"文件删除成功: {source_path}")
             else:
                 self._update(f"文件删除失败: {source_path}")
-                self.failed_items.append(source_path)
+                self._add_failed_item(source_path)
                 
         except Exception as e:
             self.logger.exception(f"删除文件出错: {source_path}, {str(e)}")
             self._update(f"删除文件出错: {source_path}, {str(e)}")
-            self.failed_items.append(source_path)
+            self._add_failed_item(source_path)
     
     def _clean_folder(self, source_path, target_path):
         """
@@ -167,32 +265,136 @@ class Cleaner:
             target_path: 目标路径（D盘路径）
         """
         try:
-            # 检查源路径是否存在
-            if not os.path.exists(source_path):
-                self._update(f"源路径不存在，跳过: {source_path}")
-                return
-            
-            # 检查目标路径是否存在
+            # 检查目标路径是否存在，目标不存在时不能删除源路径
+            # 源路径是否存在不做预先检查，由删除操作抛出的FileNotFoundError判断，减少一次stat调用
             if not os.path.exists(target_path):
+                if not os.path.lexists(source_path):
+                    self._update(f"源路径不存在，跳过: {source_path}")
+                    return
                 self._update(f"目标路径不存在，跳过: {source_path}")
-                self.failed_items.append(source_path)
+                self._add_failed_item(source_path)
                 return
             
             self._update(f"正在删除文件夹: {source_path}")
             
-            # 尝试删除文件夹
-            success = self._remove_folder_with_retry(source_path)
+            try:
+                # 先将文件夹重命名到同目录下的临时名称，再由后台线程删除
+                # 同一卷内重命名只需修改目录项，原路径立即释放，可以马上创建软链接
+                if self._rename_for_background_delete(source_path):
+                    self._update(f"文件夹删除成功: {source_path}")
+                    return
+                
+                # 重命名失败（例如文件被占用）时，使用原有的删除重试流程
+                success = self._remove_folder_with_retry(source_path)
+            except FileNotFoundError:
+                self._update(f"源路径不存在，跳过: {source_path}")
+                return
             
             if success:
                 self._update(f"文件夹删除成功: {source_path}")
             else:
                 self._update(f"文件夹删除失败: {source_path}")
-                self.failed_items.append(source_path)
+                self._add_failed_item(source_path)
                 
         except Exception as e:
             self.logger.exception(f"删除文件夹出错: {source_path}, {str(e)}")
             self._update(f"删除文件夹出错: {source_path}, {str(e)}")
-            self.failed_items.append(source_path)
+            self._add_failed_item(source_path)
+    
+    def _rename_for_background_delete(self, folder_path):
+        """
+        将文件夹重命名为临时名称，并加入后台删除队列
+        
+        Args:
+            folder_path: 文件夹路径
+            
+        Returns:
+            bool: 是否重命名成功
+        """
+        scratch_path = f"{folder_path}{self.SCRATCH_MARKER}{os.getpid()}_{uuid.uuid4().hex}"
+        try:
+            os.rename(folder_path, scratch_path)
+        except FileNotFoundError:
+            raise
+        except OSError as e:
+            self.logger.debug(f"重命名文件夹失败，改为直接删除: {folder_path}, {str(e)}")
+            return False
+        
+        self._queue_background_delete(scratch_path)
+        return True
+    
+    def _sweep_leftover_scratch(self):
+        """
+        查找之前运行中重命名后未能删除的临时文件夹，并加入后台删除队列
+        
+        临时文件夹与源文件夹位于同一目录下，只需检查映射中各文件夹的上级目录
+        """
+        parents = {os.path.dirname(source_path) for source_path in self.path_mapping
+                   if self.type_mapping.get(source_path) != 'file'}
+        own_marker = f"{self.SCRATCH_MARKER}{os.getpid()}_"
+        
+        for parent in parents:
+            try:
+                with os.scandir(parent) as it:
+                    leftovers = [entry.path for entry in it
+                                 if self.SCRATCH_MARKER in entry.name and own_marker not in entry.name
+                                 and entry.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            
+            for scratch_path in leftovers:
+                self._update(f"删除上次遗留的临时文件夹: {scratch_path}")
+                self._queue_background_delete(scratch_path)
+    
+    def _queue_background_delete(self, scratch_path):
+        """
+        将已重命名的文件夹加入后台删除队列，必要时启动后台删除线程
+        
+        Args:
+            scratch_path: 已重命名的临时文件夹路径
+        """
+        with self._delete_thread_lock:
+            if self._delete_thread is None:
+                self._delete_thread = threading.Thread(target=self._background_delete_worker, daemon=True)
+                self._delete_thread.start()
+        
+        self._delete_queue.put(scratch_path)
+    
+    def _background_delete_worker(self):
+        """
+        后台删除线程，依次删除队列中已重命名的文件夹
+        """
+        while True:
+            scratch_path = self._delete_queue.get()
+            if scratch_path is None:
+                break
+            
+            try:
+                if self._remove_folder_with_retry(scratch_path):
+                    continue
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                self.logger.warning(f"后台删除出错: {scratch_path}, {str(e)}")
+            
+            # 记录为失败项目，清理结果不会在临时文件夹残留时报告成功
+            self._update(f"后台删除失败，请手动删除: {scratch_path}")
+            self._add_failed_item(scratch_path)
+    
+    def _wait_background_delete(self):
+        """
+        等待后台删除线程处理完队列中的所有文件夹
+        """
+        with self._delete_thread_lock:
+            delete_thread = self._delete_thread
+            self._delete_thread = None
+        
+        if delete_thread is None:
+            return
+        
+        self._update("正在等待后台删除完成...")
+        self._delete_queue.put(None)
+        delete_thread.join()
     
     def _remove_file_with_retry(self, file_path):
         """
@@ -209,6 +411,11 @@ class Cleaner:
                 # 尝试删除文件
                 os.remove(file_path)
                 return True
+            except FileNotFoundError:
+                # 首次尝试即不存在说明源文件本就不存在，交由调用方处理；重试时不存在说明已被删除
+                if attempt == 0:
+                    raise
+                return True
             except PermissionError:
                 # 如果是权限错误，可能是文件被占用
                 self._update(f"文件被占用，尝试结束占用进程: {file_path}")
@@ -224,15 +431,21 @@ class Cleaner:
                 
                 # 如果不是最后一次尝试，则等待一段时间后重试
                 if attempt < self.retry_count - 1:
-                    self._update(f"等待 {self.retry_interval} 秒后重试...")
-                    time.sleep(self.retry_interval)
+                    delay = self._get_retry_delay(attempt)
+                    self._update(f"等待 {delay:.2f} 秒后重试...")
+                    # 等待期间收到取消请求时立即返回
+                    if self._cancel.wait(timeout=delay):
+                        return False
             except Exception as e:
                 self.logger.warning(f"删除文件出错: {file_path}, {str(e)}")
                 
                 # 如果不是最后一次尝试，则等待一段时间后重试
                 if attempt < self.retry_count - 1:
-                    self._update(f"等待 {self.retry_interval} 秒后重试...")
-                    time.sleep(self.retry_interval)
+                    delay = self._get_retry_delay(attempt)
+                    self._update(f"等待 {delay:.2f} 秒后重试...")
+                    # 等待期间收到取消请求时立即返回
+                    if self._cancel.wait(timeout=delay):
+                        return False
         
         return False
         
@@ -248,8 +461,17 @@ class Cleaner:
         """
         for attempt in range(self.retry_count):
             try:
+                # 优先使用系统命令删除，失败时再回退到逐个条目删除
+                if self._remove_folder_native(folder_path):
+                    return True
+                
                 # 尝试删除文件夹
-                shutil.rmtree(folder_path)
+                self._rmtree(folder_path)
+                return True
+            except FileNotFoundError:
+                # 首次尝试即不存在说明源路径本就不存在，交由调用方处理；重试时不存在说明已被删除
+                if attempt == 0:
+                    raise
                 return True
             except PermissionError:
                 # 如果是权限错误，可能是文件被占用
@@ -259,25 +481,260 @@ class Cleaner:
                 if self._kill_processes_using_folder(folder_path):
                     # 再次尝试删除
                     try:
-                        shutil.rmtree(folder_path)
+                        self._rmtree(folder_path)
                         return True
                     except Exception as e:
                         self.logger.warning(f"结束进程后删除文件夹仍然失败: {folder_path}, {str(e)}")
                 
                 # 如果不是最后一次尝试，则等待一段时间后重试
                 if attempt < self.retry_count - 1:
-                    self._update(f"等待 {self.retry_interval} 秒后重试...")
-                    time.sleep(self.retry_interval)
+                    delay = self._get_retry_delay(attempt)
+                    self._update(f"等待 {delay:.2f} 秒后重试...")
+                    # 等待期间收到取消请求时立即返回
+                    if self._cancel.wait(timeout=delay):
+                        return False
             except Exception as e:
                 self.logger.warning(f"删除文件夹出错: {folder_path}, {str(e)}")
                 
                 # 如果不是最后一次尝试，则等待一段时间后重试
                 if attempt < self.retry_count - 1:
-                    self._update(f"等待 {self.retry_interval} 秒后重试...")
-                    time.sleep(self.retry_interval)
+                    delay = self._get_retry_delay(attempt)
+                    self._update(f"等待 {delay:.2f} 秒后重试...")
+                    # 等待期间收到取消请求时立即返回
+                    if self._cancel.wait(timeout=delay):
+                        return False
         
         return False
     
+    def _rmtree(self, folder_path):
+        """
+        删除文件夹，Windows下使用并行删除，其他系统使用shutil.rmtree
+        
+        Args:
+            folder_path: 文件夹路径
+        """
+        if os.name != 'nt':
+            shutil.rmtree(folder_path)
+            return
+        
+        self._rmtree_parallel(folder_path)
+    
+    def _rmtree_parallel(self, folder_path):
+        """
+        使用os.scandir遍历目录树，并行删除文件后自底向上删除空目录
+        
+        文件数较少时直接串行删除，文件数超过阈值时分批提交到线程池并行删除。
+        单个条目删除失败时继续删除其余条目，全部处理完后再统一报告错误
+        
+        Args:
+            folder_path: 文件夹路径
+            
+        Raises:
+            FileNotFoundError: 文件夹不存在
+            PermissionError: 有条目因权限不足或被占用无法删除
+            OSError: 有条目因其他原因无法删除
+        """
+        files = []  # 需要删除的文件（包括文件软链接）
+        dirs = []  # 需要删除的目录，按先序遍历顺序排列
+        dir_links = []  # 需要删除的目录软链接/联接点，不进入其内部
+        errors = []  # 删除失败的 (路径, 异常)
+        
+        # 起始目录不存在时直接抛出，由调用方处理
+        with os.scandir(folder_path) as it:
+            entries = list(it)
+        
+        stack = []
+        current = folder_path
+        while True:
+            dirs.append(current)
+            for entry in entries:
+                try:
+                    if self._is_link_entry(entry):
+                        # 软链接和联接点只删除链接本身，不进入其指向的目录
+                        if self._is_dir_link(entry):
+                            dir_links.append(entry.path)
+                        else:
+                            files.append(entry.path)
+                    elif entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        files.append(entry.path)
+                except OSError as e:
+                    errors.append((entry.path, e))
+            
+            if not stack:
+                break
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except FileNotFoundError:
+                entries = []
+            except OSError as e:
+                errors.append((current, e))
+                entries = []
+        
+        if len(files) > self.PARALLEL_UNLINK_THRESHOLD:
+            max_workers = max(1, min(16, self.max_threads))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                batches = [files[i:i + self.UNLINK_BATCH_SIZE]
+                           for i in range(0, len(files), self.UNLINK_BATCH_SIZE)]
+                for batch_errors in executor.map(self._unlink_batch, batches):
+                    errors.extend(batch_errors)
+        else:
+            errors.extend(self._unlink_batch(files))
+        
+        # Windows下目录软链接和联接点需要用rmdir删除
+        remove_link = os.rmdir if os.name == 'nt' else os.unlink
+        for link_path in dir_links:
+            try:
+                remove_link(link_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append((link_path, e))
+        
+        # 子目录总是排在父目录之后，倒序删除即可保证自底向上
+        for dir_path in reversed(dirs):
+            try:
+                os.rmdir(dir_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append((dir_path, e))
+        
+        if errors:
+            self._raise_rmtree_errors(folder_path, errors)
+    
+    def _is_link_entry(self, entry):
+        """
+        判断目录条目是否为软链接或联接点等重解析点
+        
+        DirEntry.is_dir(follow_symlinks=False) 对联接点也返回True，不能用来判断是否可以进入
+        
+        Args:
+            entry: os.DirEntry对象
+            
+        Returns:
+            bool: 是否为链接
+        """
+        if entry.is_symlink():
+            return True
+        is_junction = getattr(entry, 'is_junction', None)  # Python 3.12+
+        if is_junction is not None and is_junction():
+            return True
+        attributes = getattr(entry.stat(follow_symlinks=False), 'st_file_attributes', 0)  # 仅Windows
+        return bool(attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+    
+    def _is_dir_link(self, entry):
+        """
+        判断链接条目本身是否为目录链接，目录链接需要用rmdir删除
+        
+        Args:
+            entry: os.DirEntry对象，已确认为链接
+            
+        Returns:
+            bool: 是否为目录链接
+        """
+        st = entry.stat(follow_symlinks=False)
+        attributes = getattr(st, 'st_file_attributes', None)
+        if attributes is not None:
+            return bool(attributes & stat.FILE_ATTRIBUTE_DIRECTORY)
+        return entry.is_dir()
+    
+    def _unlink_batch(self, paths):
+        """
+        删除一批文件，单个文件删除失败时继续删除其余文件
+        
+        Args:
+            paths: 文件路径列表
+            
+        Returns:
+            list: 删除失败的 (路径, 异常) 列表
+        """
+        errors = []
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append((path, e))
+        return errors
+    
+    def _raise_rmtree_errors(self, folder_path, errors):
+        """
+        记录并行删除中失败的条目，并抛出汇总的异常供重试逻辑处理
+        
+        Args:
+            folder_path: 正在删除的文件夹路径
+            errors: 删除失败的 (路径, 异常) 列表
+            
+        Raises:
+            PermissionError: 有条目因权限不足或被占用无法删除
+            OSError: 有条目因其他原因无法删除
+        """
+        for path, error in errors[:self.MAX_REPORTED_ERRORS]:
+            self.logger.warning(f"删除失败: {path}, {str(error)}")
+        if len(errors) > self.MAX_REPORTED_ERRORS:
+            self.logger.warning(f"另有 {len(errors) - self.MAX_REPORTED_ERRORS} 个条目删除失败")
+        
+        # 有权限错误时抛出PermissionError，使重试逻辑尝试结束占用进程
+        error_type = PermissionError if any(isinstance(e, PermissionError) for _, e in errors) else OSError
+        raise error_type(f"{len(errors)} 个条目删除失败: {folder_path}，首个错误: {errors[0][0]}, {str(errors[0][1])}")
+    
+    def _remove_folder_native(self, folder_path):
+        """
+        使用Windows的rd命令删除文件夹
+        
+        rd由系统在原生代码中遍历删除整个目录树，避免shutil.rmtree逐个条目的Python调用开销，
+        对包含大量小文件的缓存目录效果明显
+        
+        Args:
+            folder_path: 文件夹路径
+            
+        Returns:
+            bool: 是否成功，非Windows系统直接返回False
+            
+        Raises:
+            FileNotFoundError: 文件夹不存在
+        """
+        if os.name != 'nt':
+            return False
+        
+        try:
+            result = subprocess.run(['cmd', '/c', 'rd', '/s', '/q', folder_path],
+                                    capture_output=True, text=True,
+                                    creationflags=subprocess.CREATE_NO_WINDOW)
+        except Exception as e:
+            self.logger.warning(f"执行rd命令出错: {folder_path}, {str(e)}")
+            return False
+        
+        # rd在部分文件删除失败时返回码仍可能为0，以文件夹是否仍存在为准
+        exists = os.path.exists(folder_path)
+        if result.returncode != 0:
+            if not exists:
+                # 命令失败且文件夹不存在，说明文件夹本就不存在
+                raise FileNotFoundError(folder_path)
+            self.logger.debug(f"rd命令删除文件夹失败: {folder_path}, {result.stderr.strip()}")
+        return not exists
+    
+    def _get_retry_delay(self, attempt):
+        """
+        计算重试等待时间
+        
+        大多数临时占用在很短时间内就会释放，使用指数退避加随机抖动，
+        避免每次都等待固定的重试间隔
+        
+        Args:
+            attempt: 当前尝试次数（从0开始）
+            
+        Returns:
+            float: 等待时间（秒）
+        """
+        delay = min(self.retry_interval, self.retry_base_ms / 1000.0 * (2 ** attempt))
+        return delay + random.uniform(0, 0.05)
+    
     def _kill_processes_using_file(self, file_path):
         """
         结束占用文件的进程
@@ -289,41 +746,16 @@ class Cleaner:
             bool: 是否成功
         """
         try:
-            # 使用PowerShell命令查找占用文件的进程
-            cmd = f'powershell "Get-Process | Where-Object {{$_.Modules.FileName -eq \"{file_path}\"}} | Select-Object Id, ProcessName | ConvertTo-Csv -NoTypeInformation"'
+            processes = self._find_processes_using_file(file_path)
             
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
+            if not processes:
+                self._update(f"未找到占用文件的进程: {file_path}")
+                return False
             
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                processes = []
-                
-                if len(lines) > 1:  # 第一行是标题行
-                    for line in lines[1:]:  # 跳过标题行
-                        if '"' in line:
-                            parts = line.strip('"').split('","')
-                            if len(parts) >= 2:
-                                pid = parts[0]
-                                name = parts[1]
-                                processes.append((pid, name))
-                
-                if not processes:
-                    self._update(f"未找到占用文件的进程: {file_path}")
-                    return False
-                
-                # 结束进程
-                for pid, name in processes:
-                    self._update(f"正在结束进程: {name} (PID: {pid})")
-                    try:
-                        # 使用taskkill命令结束进程
-                        subprocess.run(f'taskkill /F /PID {pid}', shell=True, check=True)
-                    except subprocess.CalledProcessError as e:
-                        self.logger.warning(f"结束进程失败: {name} (PID: {pid}), {str(e)}")
-                
-                # 等待一段时间，让系统释放文件句柄
-                time.sleep(1)
-                
-                return True
+            # 结束进程
+            self._kill_processes(processes)
+            
+            return True
         except Exception as e:
             self.logger.warning(f"结束占用进程出错: {str(e)}")
             return False
@@ -339,12 +771,6 @@ class Cleaner:
             bool: 是否成功
         """
         try:
-            # 使用handle命令查找占用文件夹的进程
-            # 需要安装SysInternals的Handle工具
-            # 如果没有安装，可以使用其他方法，如tasklist和findstr
-            
-            # 使用tasklist和findstr查找占用进程
-            # 这种方法不太精确，但不需要额外的工具
             processes = self._find_processes_using_folder(folder_path)
             
             if not processes:
@@ -352,22 +778,63 @@ class Cleaner:
                 return False
             
             # 结束进程
-            for pid, name in processes:
-                self._update(f"正在结束进程: {name} (PID: {pid})")
-                try:
-                    # 使用taskkill命令结束进程
-                    subprocess.run(f'taskkill /F /PID {pid}', shell=True, check=True)
-                except subprocess.CalledProcessError as e:
-                    self.logger.warning(f"结束进程失败: {name} (PID: {pid}), {str(e)}")
-            
-            # 等待一段时间，让系统释放文件句柄
-            time.sleep(1)
+            self._kill_processes(processes)
             
             return True
         except Exception as e:
             self.logger.warning(f"结束占用进程出错: {str(e)}")
             return False
     
+    def _kill_processes(self, processes):
+        """
+        结束进程
+        
+        taskkill支持多个/PID参数，所有进程通过一次调用结束，避免每个进程单独启动一次taskkill
+        
+        Args:
+            processes: 进程列表，每个元素为 (pid, name)
+            
+        Returns:
+            bool: 是否全部结束成功
+        """
+        args = ['taskkill', '/F']
+        for pid, name in processes:
+            self._update(f"正在结束进程: {name} (PID: {pid})")
+            args += ['/PID', str(pid)]
+        
+        try:
+            # 使用taskkill命令结束进程
+            result = subprocess.run(args, shell=False, capture_output=True, text=True)
+            if result.returncode != 0:
+                self.logger.warning(f"结束进程失败: {result.stderr.strip() or result.stdout.strip()}")
+        except Exception as e:
+            self.logger.warning(f"结束进程出错: {str(e)}")
+            return False
+        
+        # 进程已结束，占用进程缓存失效
+        with self._holders_lock:
+            self._holders_cache = None
+        
+        # 等待一段时间，让系统释放文件句柄
+        time.sleep(1)
+        
+        return result.returncode == 0
+    
+    def _find_processes_using_file(self, file_path):
+        """
+        查找占用文件的进程
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            list: 进程列表，每个元素为 (pid, name)
+        """
+        if PSUTIL_AVAILABLE:
+            return self._find_holders_cached(file_path, match_prefix=False)
+        
+        return self._find_processes_with_powershell(f"$_.Modules.FileName -eq {self._ps_quote(file_path)}")
+    
     def _find_processes_using_folder(self, folder_path):
         """
         查找占用文件夹的进程
@@ -375,33 +842,158 @@ class Cleaner:
         Args:
             folder_path: 文件夹路径
             
+        Returns:
+            list: 进程列表，每个元素为 (pid, name)
+        """
+        if PSUTIL_AVAILABLE:
+            return self._find_holders_cached(folder_path, match_prefix=True)
+        
+        return self._find_processes_with_powershell(f"$_.Modules.FileName -like {self._ps_quote(folder_path + '*')}")
+    
+    def _find_holders_cached(self, path, match_prefix):
+        """
+        查找占用指定路径的进程，映射文件中的路径使用缓存结果
+        
+        所有进程打开的文件只枚举一次，并按所属的映射路径分组缓存，
+        多个映射路径被占用时不必每次都重新枚举全部进程
+        
+        Args:
+            path: 文件或文件夹路径
+            match_prefix: 是否按路径前缀匹配（用于文件夹）
+            
+        Returns:
+            list: 进程列表，每个元素为 (pid, name)
+        """
+        key = os.path.normcase(os.path.abspath(path))
+        with self._holders_lock:
+            if self._holders_cache is None:
+                self._holders_cache = self._build_holders_cache()
+            holders = self._holders_cache.get(key)
+        
+        # 不在映射文件中的路径（例如后台删除使用的临时路径）直接查找
+        if holders is None:
+            return self._find_holders(path, match_prefix)
+        
+        return list(holders)
+    
+    def _build_holders_cache(self):
+        """
+        枚举所有进程打开的文件，按所属的映射路径分组
+        
+        每个打开的文件沿父目录逐级向上查找，归属到最近的映射路径
+        
+        Returns:
+            dict: 规范化后的源路径到占用进程集合的映射
+        """
+        cache = {os.path.normcase(os.path.abspath(source_path)): set()
+                 for source_path in self.path_mapping}
+        
+        for proc in psutil.process_iter(['pid', 'name']):
+            try:
+                open_files = proc.open_files()
+            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            except Exception as e:
+                self.logger.debug(f"获取进程打开的文件出错: PID {proc.pid}, {str(e)}")
+                continue
+            
+            for open_file in open_files:
+                current = os.path.normcase(open_file.path)
+                while True:
+                    holders = cache.get(current)
+                    if holders is not None:
+                        holders.add((proc.info['pid'], proc.info['name']))
+                        break
+                    parent = os.path.dirname(current)
+                    if parent == current:
+                        break
+                    current = parent
+        
+        return cache
+    
+    def _find_holders(self, path, match_prefix):
+        """
+        使用psutil在进程内枚举打开的文件句柄，查找占用指定路径的进程
+        
+        相比启动PowerShell，无需额外的进程启动开销，并且能够找到打开数据文件的进程，
+        而不仅仅是加载了DLL模块的进程
+        
+        Args:
+            path: 文件或文件夹路径
+            match_prefix: 是否按路径前缀匹配（用于文件夹）
+            
+        Returns:
+            list: 进程列表，每个元素为 (pid, name)
+        """
+        processes = []
+        target = os.path.normcase(os.path.abspath(path))
+        prefix = target.rstrip(os.sep) + os.sep
+        
+        for proc in psutil.process_iter(['pid', 'name']):
+            try:
+                open_files = proc.open_files()
+            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            except Exception as e:
+                self.logger.debug(f"获取进程打开的文件出错: PID {proc.pid}, {str(e)}")
+                continue
+            
+            for open_file in open_files:
+                file_path = os.path.normcase(open_file.path)
+                if file_path == target or (match_prefix and file_path.startswith(prefix)):
+                    processes.append((proc.info['pid'], proc.info['name']))
+                    break
+        
+        return processes
+    
+    def _find_processes_with_powershell(self, condition):
+        """
+        使用PowerShell查找占用进程，仅在psutil不可用时使用
+        
+        Args:
+            condition: Where-Object的过滤条件
+            
         Returns:
             list: 进程列表，每个元素为 (pid, name)
         """
         processes = []
         
         try:
-            # 使用PowerShell命令查找占用文件夹的进程
-            # 这种方法比较精确，但需要PowerShell支持
-            cmd = f'powershell "Get-Process | Where-Object {{$_.Modules.FileName -like \"{folder_path}*\"}} | Select-Object Id, ProcessName | ConvertTo-Csv -NoTypeInformation"'
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-            
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                if len(lines) > 1:  # 第一行是标题行
-                    for line in lines[1:]:  # 跳过标题行
-                        if '"' in line:
-                            parts = line.strip('"').split('","')
-                            if len(parts) >= 2:
-                                pid = parts[0]
-                                name = parts[1]
-                                processes.append((pid, name))
+            # 以参数列表方式调用，不经过cmd.exe解析，路径中的空格和引号不会破坏命令
+            script = (f"Get-Process | Where-Object {{{condition}}} | "
+                      f"Select-Object Id, ProcessName | ConvertTo-Json -Compress")
+            result = subprocess.run(['powershell', '-NoProfile', '-Command', script],
+                                    capture_output=True, shell=False)
+            
+            if result.returncode == 0 and result.stdout.strip():
+                if ORJSON_AVAILABLE:
+                    items = orjson.loads(result.stdout)
+                else:
+                    items = json.loads(result.stdout)
+                
+                # 只有一个进程时ConvertTo-Json输出的是对象而不是数组
+                if isinstance(items, dict):
+                    items = [items]
+                
+                for item in items:
+                    processes.append((item['Id'], item['ProcessName']))
         except Exception as e:
             self.logger.warning(f"查找占用进程出错: {str(e)}")
         
         return processes
     
+    def _ps_quote(self, value):
+        """
+        将字符串转换为PowerShell单引号字符串字面量
+        
+        Args:
+            value: 字符串
+            
+        Returns:
+            str: PowerShell字符串字面量
+        """
+        return "'" + value.replace("'", "''") + "'"
+    
     def _update(self, message):
         """
         更新消息
@@ -409,14 +1001,40 @@ class Cleaner:
         Args:
             message: 消息内容
         """
-        # 确保消息中包含完整的配置信息
-        if self.update_callback:
-            self.update_callback(message)
         self.logger.info(message)
+        
+        if not self.update_callback:
+            return
+        
+        # 消息先写入缓冲区，超过50条或距上次发送超过33毫秒时合并为一条发送，
+        # 避免逐条回调导致界面线程频繁刷新
+        with self._buf_lock:
+            self._msg_buf.append(message)
+            now = time.monotonic()
+            if len(self._msg_buf) < self.MSG_BATCH_SIZE and now - self._last_flush < self.MSG_FLUSH_INTERVAL:
+                return
+            batch = self._msg_buf
+            self._msg_buf = []
+            self._last_flush = now
+        
+        self.update_callback('\n'.join(batch))
+    
+    def _flush_updates(self):
+        """
+        发送缓冲区中剩余的消息
+        """
+        with self._buf_lock:
+            batch = self._msg_buf
+            self._msg_buf = []
+            self._last_flush = time.monotonic()
+        
+        if batch and self.update_callback:
+            self.update_callback('\n'.join(batch))
     
     def stop(self):
         """
         停止清理
         """
-        self.is_running = False
-        self._update("正在停止清理...")
\ No newline at end of file
+        self._cancel.set()
+        self._update("正在停止清理...")
+        self._flush_updates()
\ No newline at end of file
@@ -9,17 +9,30 @@
 
 import os
 import json
+import stat
 import time
+import queue
 import logging
+import threading
 import subprocess
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 class Linker:
     """软链接创建器"""
     
+    DONE_FLUSH_SIZE = 50  # 已完成记录累计达到该数量时写入文件
+    LINK_BATCH_SIZE = 32  # 每个线程任务处理的同一目录下链接的最大数量
+    UI_FLUSH_INTERVAL = 0.033  # 界面回调的合并发送间隔（秒），约30Hz
+    
     def __init__(self, mapping_file, check_timeout=10,
-                 update_callback=None, progress_callback=None):
+                 update_callback=None, progress_callback=None, verify_links=False):
         """
         初始化链接器
         
@@ -28,9 +41,11 @@ class Linker:
             check_timeout: 链接检查超时时间（秒）
             update_callback: 更新回调函数
             progress_callback: 进度回调函数
+            verify_links: 创建成功后是否再次检查链接，系统调用成功即表示链接已创建，默认不检查
         """
         self.mapping_file = mapping_file
         self.check_timeout = check_timeout
+        self.verify_links = verify_links
         self.update_callback = update_callback
         self.progress_callback = progress_callback
         self.logger = logging.getLogger('MigrateC.Linker')
@@ -39,6 +54,13 @@ class Linker:
         self.processed_links = 0  # 已处理链接数
         self.is_running = True  # 运行标志
         self.failed_links = []  # 创建失败的链接
+        self.lock = threading.Lock()  # 线程锁
+        self._admin = None  # 管理员权限检查结果缓存
+        self._done_file = mapping_file + '.done'  # 已成功创建的链接记录文件
+        self._pending_done = []  # 尚未写入记录文件的已成功链接
+        self._parent_ok = {}  # 源路径父目录是否存在的缓存
+        self._ui_queue = queue.Queue()  # 待发送给界面的消息和进度
+        self._ui_thread = None  # 界面回调发送线程
     
     def create_links(self):
         """
@@ -47,6 +69,9 @@ class Linker:
         Returns:
             bool: 是否成功
         """
+        # 界面回调由单独的线程合并发送，避免工作线程等待界面刷新
+        self._start_ui_thread()
+        
         try:
             # 检查管理员权限
             if not self._is_admin():
@@ -57,37 +82,58 @@ class Linker:
             if not self._load_mapping():
                 return False
             
+            # 跳过之前运行中已成功创建且仍然有效的链接，重新运行时只处理失败、被删除或目标已变化的链接
+            done = self._load_done()
+            if done:
+                pending = {source_path: target_path for source_path, target_path in self.path_mapping.items()
+                           if (source_path, target_path) not in done or not self._is_done_link_valid(source_path, target_path)}
+                skipped = len(self.path_mapping) - len(pending)
+                if skipped:
+                    self._update(f"跳过 {skipped} 个此前已成功创建的链接")
+                self.path_mapping = pending
+            
             self.total_links = len(self.path_mapping)
             
             if self.total_links == 0:
+                # 所有链接都已在之前创建完成，记录文件不再需要
+                self._remove_done()
                 self._update("没有找到需要创建链接的路径")
+                self._report_progress(100)
                 return True
             
             self._update(f"开始创建 {self.total_links} 个软链接")
             
+            # 进度换算系数，避免在循环中重复计算
+            progress_scale = 100.0 / self.total_links
+            
             # 更新进度
-            if self.progress_callback:
-                self.progress_callback(0)
+            self._report_progress(0)
             
-            # 创建软链接
-            for source_path, target_path in self.path_mapping.items():
-                if not self.is_running:
-                    break
-                
-                self._create_link(source_path, target_path)
+            # 按父目录分组，同一目录下的链接由同一个线程依次创建，
+            # 提高目录元数据的缓存命中率，并减少多个线程争用同一目录
+            batches = self._group_by_parent(self.path_mapping.items())
+            
+            # 使用线程池并行创建软链接
+            with ThreadPoolExecutor(max_workers=min(8, len(batches))) as executor:
+                futures = [executor.submit(self._create_link_batch, batch) for batch in batches]
                 
-                # 更新进度
-                self.processed_links += 1
-                progress = int(self.processed_links / max(1, self.total_links) * 100)
-                if self.progress_callback and progress <= 100:
-                    self.progress_callback(progress)
+                last_progress = -1
+                for future in as_completed(futures):
+                    # 更新进度，进度只有100个不同的值，仅在变化时回调
+                    with self.lock:
+                        self.processed_links += future.result()
+                        progress = int(self.processed_links * progress_scale)
+                    if progress <= 100 and progress != last_progress:
+                        self._report_progress(progress)
+                        last_progress = progress
             
             # 输出结果
             if self.is_running:
                 if len(self.failed_links) == 0:
+                    # 所有链接都已创建成功，记录文件不再需要
+                    self._remove_done()
                     self._update(f"链接创建完成，所有链接已成功创建")
-                    if self.progress_callback:
-                        self.progress_callback(100)
+                    self._report_progress(100)
                     return True
                 else:
                     self._update(f"链接创建部分完成，{len(self.failed_links)} 个链接创建失败")
@@ -102,6 +148,131 @@ class Linker:
             self.logger.exception(f"创建链接出错: {str(e)}")
             self._update(f"创建链接出错: {str(e)}")
             return False
+        finally:
+            # 写入剩余的已完成记录
+            self._flush_done()
+            # 发送剩余的界面消息
+            self._stop_ui_thread()
+    
+    def _group_by_parent(self, items):
+        """
+        按源路径的父目录对链接分组
+        
+        Args:
+            items: (源路径, 目标路径) 的可迭代对象
+            
+        Returns:
+            list: 链接分组列表，每组最多包含 LINK_BATCH_SIZE 个同一父目录下的链接
+        """
+        batches = []
+        batch = []
+        last_parent = None
+        for source_path, target_path in sorted(items, key=lambda item: os.path.dirname(item[0])):
+            parent = os.path.dirname(source_path)
+            if batch and (parent != last_parent or len(batch) >= self.LINK_BATCH_SIZE):
+                batches.append(batch)
+                batch = []
+            batch.append((source_path, target_path))
+            last_parent = parent
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _create_link_batch(self, batch):
+        """
+        依次创建一组软链接
+        
+        Args:
+            batch: (源路径, 目标路径) 列表
+            
+        Returns:
+            int: 已处理的链接数量
+        """
+        for source_path, target_path in batch:
+            self._create_link(source_path, target_path)
+        return len(batch)
+    
+    def _load_done(self):
+        """
+        加载已成功创建的链接记录
+        
+        Returns:
+            set: 已成功创建的 (源路径, 目标路径) 集合
+        """
+        if not os.path.exists(self._done_file):
+            return set()
+        
+        try:
+            done = set()
+            with open(self._done_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # 每行为 源路径\t目标路径，旧格式只有源路径的记录无法确认目标，忽略
+                    source_path, sep, target_path = line.rstrip('\n').partition('\t')
+                    if sep:
+                        done.add((source_path, target_path))
+            return done
+        except Exception as e:
+            self.logger.warning(f"加载已完成链接记录出错: {self._done_file}, {str(e)}")
+            return set()
+    
+    def _is_done_link_valid(self, source_path, target_path):
+        """
+        检查此前记录为已完成的链接是否仍然存在并指向同一目标
+        
+        Args:
+            source_path: 源路径（C盘路径）
+            target_path: 目标路径（D盘路径）
+            
+        Returns:
+            bool: 链接是否仍然有效
+        """
+        try:
+            return self._is_link_to(source_path, target_path)
+        except OSError:
+            return False
+    
+    def _mark_done(self, source_path, target_path):
+        """
+        记录已成功创建的链接，累计一定数量后批量写入文件
+        
+        Args:
+            source_path: 源路径（C盘路径）
+            target_path: 目标路径（D盘路径）
+        """
+        with self.lock:
+            self._pending_done.append((source_path, target_path))
+            if len(self._pending_done) < self.DONE_FLUSH_SIZE:
+                return
+        
+        self._flush_done()
+    
+    def _flush_done(self):
+        """
+        将已成功创建的链接追加写入记录文件
+        """
+        with self.lock:
+            batch = self._pending_done
+            self._pending_done = []
+            if not batch:
+                return
+            
+            try:
+                with open(self._done_file, 'a', encoding='utf-8') as f:
+                    f.write(''.join(f"{source_path}\t{target_path}\n" for source_path, target_path in batch))
+            except Exception as e:
+                self.logger.warning(f"写入已完成链接记录出错: {self._done_file}, {str(e)}")
+    
+    def _remove_done(self):
+        """
+        写入剩余的记录后删除已完成链接记录文件
+        """
+        self._flush_done()
+        try:
+            os.remove(self._done_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"删除已完成链接记录出错: {self._done_file}, {str(e)}")
     
     def _load_mapping(self):
         """
@@ -111,15 +282,44 @@ class Linker:
             bool: 是否成功
         """
         try:
-            with open(self.mapping_file, 'r', encoding='utf-8') as f:
-                mapping_data = json.load(f)
-                self.path_mapping = mapping_data.get('path_mapping', {})
+            if ORJSON_AVAILABLE:
+                # orjson在C中解析，映射条目较多时明显快于标准库json
+                with open(self.mapping_file, 'rb') as f:
+                    mapping_data = orjson.loads(f.read())
+            else:
+                with open(self.mapping_file, 'r', encoding='utf-8') as f:
+                    mapping_data = json.load(f)
+            self.path_mapping = self._dedupe_mapping(mapping_data.get('path_mapping', {}))
             return True
         except Exception as e:
             self.logger.exception(f"加载映射出错: {str(e)}")
             self._update(f"加载映射出错: {str(e)}")
             return False
     
+    def _dedupe_mapping(self, path_mapping):
+        """
+        去除指向同一源路径的重复映射
+        
+        大小写或分隔符不同的路径在Windows下是同一路径，并行创建链接时会互相冲突。
+        规范化使用os.path.abspath而不是os.path.realpath，后者需要逐级读取链接，开销更大
+        
+        Args:
+            path_mapping: 路径映射
+            
+        Returns:
+            dict: 去重后的路径映射，保留每个源路径第一次出现的映射
+        """
+        result = {}
+        seen = set()
+        for source_path, target_path in path_mapping.items():
+            key = os.path.normcase(os.path.abspath(source_path))
+            if key in seen:
+                self.logger.warning(f"忽略重复的映射: {source_path} -> {target_path}")
+                continue
+            seen.add(key)
+            result[source_path] = target_path
+        return result
+    
     def _create_link(self, source_path, target_path):
         """
         创建软链接
@@ -128,64 +328,106 @@ class Linker:
             source_path: 源路径（C盘路径）
             target_path: 目标路径（D盘路径）
         """
+        if not self.is_running:
+            return
+        
         try:
-            # 检查源路径是否存在
-            if os.path.exists(source_path):
+            # 源路径的父目录不存在时无法创建链接，同一目录只检查一次
+            parent = os.path.dirname(source_path)
+            parent_ok = self._parent_ok.get(parent)
+            if parent_ok is None:
+                parent_ok = os.path.isdir(parent)
+                self._parent_ok[parent] = parent_ok
+            if not parent_ok:
+                self._update(f"源路径的父目录不存在，跳过: {source_path}")
+                self._add_failed_link(source_path)
+                return
+            
+            # 检查源路径是否存在，不跟随符号链接，已存在的链接（包括失效的链接）也视为存在
+            source_st = self._stat(source_path, follow_symlinks=False)
+            if source_st is not None:
+                # 已存在但指向其他位置的链接不能视为已完成
+                if stat.S_ISLNK(source_st.st_mode) and not self._is_link_to(source_path, target_path):
+                    self._update(f"源路径已存在指向其他位置的链接，跳过: {source_path}")
+                    self._add_failed_link(source_path)
+                    return
                 self._update(f"源路径已存在，跳过: {source_path}")
                 return
             
-            # 检查目标路径是否存在
-            if not os.path.exists(target_path):
+            # 检查目标路径是否存在，同时获取目标类型，避免再次stat
+            target_st = self._stat(target_path)
+            if target_st is None:
                 self._update(f"目标路径不存在，跳过: {target_path}")
-                self.failed_links.append(source_path)
+                self._add_failed_link(source_path)
                 return
             
-            self._update(f"正在创建软链接: {source_path} -> {target_path}")
+            # 创建过程只记录到调试日志，界面上只显示结果，减少每个链接的回调次数
+            self.logger.debug("正在创建软链接: %s -> %s", source_path, target_path)
             
             # 创建软链接
-            success = self._create_symlink(source_path, target_path)
+            success = self._create_symlink(source_path, target_path, stat.S_ISDIR(target_st.st_mode))
             
             if success:
-                # 检查链接是否生效
-                if self._check_link(source_path, target_path):
-                    self._update(f"软链接创建成功: {source_path} -> {target_path}")
+                # 检查链接是否生效，仅在开启验证时执行
+                if not self.verify_links or self._check_link(source_path, target_path):
+                    # 没有界面回调且日志级别不输出INFO时，不再构造成功消息
+                    if self.update_callback or self.logger.isEnabledFor(logging.INFO):
+                        self._update(f"软链接创建成功: {source_path} -> {target_path}")
+                    self._mark_done(source_path, target_path)
                 else:
                     self._update(f"软链接创建失败，链接检查未通过: {source_path}")
-                    self.failed_links.append(source_path)
+                    self._add_failed_link(source_path)
             else:
                 self._update(f"软链接创建失败: {source_path}")
-                self.failed_links.append(source_path)
+                self._add_failed_link(source_path)
                 
         except Exception as e:
             self.logger.exception(f"创建软链接出错: {source_path}, {str(e)}")
             self._update(f"创建软链接出错: {source_path}, {str(e)}")
-            self.failed_links.append(source_path)
+            self._add_failed_link(source_path)
     
-    def _create_symlink(self, source_path, target_path):
+    def _add_failed_link(self, path):
+        """
+        记录创建失败的链接
+        
+        Args:
+            path: 创建失败的链接路径
+        """
+        with self.lock:
+            self.failed_links.append(path)
+    
+    def _create_symlink(self, source_path, target_path, is_directory):
         """
         创建符号链接
         
         Args:
             source_path: 源路径（C盘路径）
             target_path: 目标路径（D盘路径）
+            is_directory: 目标路径是否为目录
             
         Returns:
             bool: 是否成功
         """
+        # 直接调用系统接口创建符号链接，避免每个链接启动一次cmd进程
         try:
-            # 判断目标路径是文件还是目录
-            is_directory = os.path.isdir(target_path)
-            
-            # 根据类型选择不同的mklink命令
+            os.symlink(target_path, source_path, target_is_directory=is_directory)
+            return True
+        except OSError as e:
+            self.logger.warning(f"os.symlink创建符号链接失败，尝试使用mklink: {source_path}, "
+                                f"错误码: {getattr(e, 'winerror', None) or e.errno}, {str(e)}")
+        
+        try:
+            # 根据类型选择不同的mklink命令，以参数列表方式调用，不经过shell
             if is_directory:
                 # 创建目录符号链接
-                cmd = f'cmd /c mklink /D "{source_path}" "{target_path}"'
+                cmd = ['cmd', '/c', 'mklink', '/D', source_path, target_path]
             else:
                 # 创建文件符号链接
-                cmd = f'cmd /c mklink "{source_path}" "{target_path}"'
+                cmd = ['cmd', '/c', 'mklink', source_path, target_path]
             
-            self.logger.info(f"执行命令: {cmd}")
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
+            self.logger.info(f"执行命令: {subprocess.list2cmdline(cmd)}")
+            result = subprocess.run(cmd, capture_output=True, text=True,
+                                    creationflags=subprocess.CREATE_NO_WINDOW)
             
             if result.returncode == 0:
                 return True
@@ -208,49 +450,64 @@ class Linker:
             bool: 是否生效
         """
         try:
-            # 判断目标路径是文件还是目录
-            is_directory = os.path.isdir(target_path)
-            
-            # 等待链接生效
-            start_time = time.time()
-            while time.time() - start_time < self.check_timeout:
-                # 首先检查源路径是否存在
-                if os.path.exists(source_path):
-                    # 简单检查：如果源路径存在，且类型与目标路径一致，则认为链接已生效
-                    if (is_directory and os.path.isdir(source_path)) or \
-                       (not is_directory and os.path.isfile(source_path)):
-                        # 使用Path对象检查是否为符号链接
-                        if Path(source_path).is_symlink():
-                            return True
-                        
-                        # 备用方法：使用dir命令检查
-                        try:
-                            if is_directory:
-                                cmd = f'cmd /c dir "{os.path.dirname(source_path)}" | findstr "{os.path.basename(source_path)}" | findstr "<SYMLINKD>"'
-                            else:
-                                cmd = f'cmd /c dir "{os.path.dirname(source_path)}" | findstr "{os.path.basename(source_path)}" | findstr "<SYMLINK>"'
-                            
-                            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-                            if result.returncode == 0 and ("<SYMLINKD>" in result.stdout or "<SYMLINK>" in result.stdout):
-                                return True
-                        except Exception as e:
-                            self.logger.warning(f"检查链接命令执行出错: {str(e)}")
-                
-                time.sleep(0.5)
-            
-            # 如果超时后源路径存在，但上面的检查都未通过，再做一次最终检查
-            if os.path.exists(source_path):
-                # 如果源路径存在且类型正确，可能是检测方法有问题，认为链接已生效
-                if (is_directory and os.path.isdir(source_path)) or \
-                   (not is_directory and os.path.isfile(source_path)):
-                    self.logger.info(f"链接似乎已创建但未通过标准检查，源路径存在: {source_path}")
+            # 链接创建是同步完成的，通常第一次检查即可通过；
+            # 否则以指数退避（10ms起，最长0.5s）重试，直到超时
+            delay = 0.01
+            deadline = time.monotonic() + self.check_timeout
+            while True:
+                if self._is_link_to(source_path, target_path):
                     return True
-            
-            return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.5)
         except Exception as e:
             self.logger.warning(f"检查链接出错: {str(e)}")
             return False
     
+    def _is_link_to(self, source_path, target_path):
+        """
+        检查源路径是否为指向目标路径的符号链接
+        
+        Args:
+            source_path: 源路径（C盘路径）
+            target_path: 目标路径（D盘路径）
+            
+        Returns:
+            bool: 是否为指向目标路径的符号链接
+        """
+        source_st = self._stat(source_path, follow_symlinks=False)
+        if source_st is None or not stat.S_ISLNK(source_st.st_mode):
+            return False
+        
+        link_target = os.readlink(source_path)
+        # Windows下读取的链接目标可能带有\\?\前缀
+        if link_target.startswith('\\\\?\\'):
+            link_target = link_target[4:]
+        # 相对链接目标相对于链接所在目录
+        link_target = os.path.join(os.path.dirname(source_path), link_target)
+        
+        return os.path.normcase(os.path.abspath(link_target)) == os.path.normcase(os.path.abspath(target_path))
+    
+    def _stat(self, path, follow_symlinks=True):
+        """
+        获取路径的状态信息
+        
+        一次stat调用同时得到是否存在和类型信息，代替os.path.exists、os.path.isdir等多次调用
+        
+        Args:
+            path: 路径
+            follow_symlinks: 是否跟随符号链接
+            
+        Returns:
+            os.stat_result: 状态信息，路径不存在时返回None
+        """
+        try:
+            return os.stat(path, follow_symlinks=follow_symlinks)
+        except OSError:
+            return None
+    
     def _is_admin(self):
         """
         检查是否具有管理员权限
@@ -258,8 +515,80 @@ class Linker:
         Returns:
             bool: 是否具有管理员权限
         """
-        from modules.utils import is_admin
-        return is_admin()
+        # 进程的权限在运行期间不会改变，只检查一次
+        if self._admin is None:
+            from modules.utils import is_admin
+            self._admin = is_admin()
+        return self._admin
+    
+    def _start_ui_thread(self):
+        """
+        启动界面回调发送线程
+        """
+        if not (self.update_callback or self.progress_callback) or self._ui_thread is not None:
+            return
+        
+        self._ui_thread = threading.Thread(target=self._ui_worker, name='LinkerUI', daemon=True)
+        self._ui_thread.start()
+    
+    def _stop_ui_thread(self):
+        """
+        停止界面回调发送线程，并等待剩余消息发送完成
+        """
+        if self._ui_thread is None:
+            return
+        
+        self._ui_queue.put(None)
+        self._ui_thread.join()
+        self._ui_thread = None
+    
+    def _ui_worker(self):
+        """
+        界面回调发送线程，每隔约33毫秒将队列中的消息合并为一条发送，进度只发送最新值
+        """
+        running = True
+        while running:
+            # 等待第一条消息，然后在发送间隔内继续收集
+            items = [self._ui_queue.get()]
+            time.sleep(self.UI_FLUSH_INTERVAL)
+            while True:
+                try:
+                    items.append(self._ui_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            messages = []
+            progress = None
+            for item in items:
+                if item is None:
+                    running = False
+                elif item[0] == 'update':
+                    messages.append(item[1])
+                else:
+                    progress = item[1]
+            
+            try:
+                if messages and self.update_callback:
+                    self.update_callback('\n'.join(messages))
+                if progress is not None and self.progress_callback:
+                    self.progress_callback(progress)
+            except Exception as e:
+                self.logger.warning(f"界面回调出错: {str(e)}")
+    
+    def _report_progress(self, progress):
+        """
+        更新进度
+        
+        Args:
+            progress: 进度值（0-100）
+        """
+        if not self.progress_callback:
+            return
+        
+        if self._ui_thread is not None:
+            self._ui_queue.put(('progress', progress))
+        else:
+            self.progress_callback(progress)
     
     def _update(self, message):
         """
@@ -268,7 +597,12 @@ class Linker:
         Args:
             message: 消息内容
         """
-        # 确保消息中包含完整的配置信息
-        if self.update_callback:
-            self.update_callback(message)
-        self.logger.info(message)
\ No newline at end of file
+        self.logger.info(message)
+        
+        if not self.update_callback:
+            return
+        
+        if self._ui_thread is not None:
+            self._ui_queue.put(('update', message))
+        else:
+            self.update_callback(message)
\ No newline at end of file
@@ -4,28 +4,165 @@
 """
 迁移模块
 
-用于将大文件夹压缩、移动到目标路径并解压
+用于将大文件夹和大文件迁移到目标路径
 """
 
 import os
+import sys
 import json
+import zlib
+import errno
+import queue
 import shutil
+import tarfile
 import zipfile
 import logging
 import threading
 import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 # 导入资源监控模块
-from modules.resource_monitor import ResourceMonitor
+from modules.resource_monitor import ResourceMonitor, MemoryPressure
+
+
+# 文件大小单位
+_SIZE_UNITS = (('B', 1), ('KB', 1 << 10), ('MB', 1 << 20), ('GB', 1 << 30))
+
+
+def _format_size(size_bytes):
+    """
+    格式化文件大小
+
+    Args:
+        size_bytes: 文件大小（字节）
+
+    Returns:
+        str: 格式化后的文件大小
+    """
+    # 根据二进制位数直接确定单位，每10位对应一级单位
+    index = max(0, min(3, (int(size_bytes).bit_length() - 1) // 10))
+    if index == 0:
+        return f"{size_bytes} B"
+    unit, divisor = _SIZE_UNITS[index]
+    return f"{size_bytes / divisor:.2f} {unit}"
+
+
+def _format_time(seconds):
+    """
+    格式化时间
+
+    Args:
+        seconds: 秒数
+
+    Returns:
+        str: 格式化后的时间
+    """
+    if seconds < 60:
+        return f"{seconds:.1f}秒"
+    elif seconds < 3600:
+        minutes = seconds / 60
+        return f"{minutes:.1f}分钟"
+    else:
+        hours = seconds / 3600
+        return f"{hours:.1f}小时"
+
+
+class _SpeedEstimator:
+    """传输速度估算器，使用指数移动平均反映最近一段时间的速度"""
+    
+    ALPHA = 0.3  # 最新采样速度的权重
+    REFORMAT_RATIO = 0.1  # 速度变化超过该比例时才重新格式化速度字符串
+    
+    __slots__ = ('speed', 'speed_str', '_shown_speed', '_last_ns', '_last_bytes')
+    
+    def __init__(self, start_ns):
+        """
+        初始化速度估算器
+        
+        Args:
+            start_ns: 开始时间（time.monotonic_ns）
+        """
+        self.speed = 0.0  # 平滑后的速度（字节/秒）
+        self.speed_str = ""  # 最近一次格式化的速度字符串
+        self._shown_speed = 0.0  # speed_str对应的速度
+        self._last_ns = start_ns
+        self._last_bytes = 0
+    
+    def update(self, now_ns, processed):
+        """
+        根据两次进度更新之间的增量更新速度
+        
+        Args:
+            now_ns: 当前时间（time.monotonic_ns）
+            processed: 累计已处理的字节数
+            
+        Returns:
+            float: 平滑后的速度（字节/秒），尚无有效采样时为0
+        """
+        delta_ns = now_ns - self._last_ns
+        if delta_ns > 0:
+            instant_speed = (processed - self._last_bytes) * 1e9 / delta_ns
+            if self.speed > 0:
+                self.speed = self.ALPHA * instant_speed + (1 - self.ALPHA) * self.speed
+            else:
+                self.speed = instant_speed
+            self._last_ns = now_ns
+            self._last_bytes = processed
+        
+        # 速度变化不大时沿用上次的字符串
+        if self.speed > 0 and abs(self.speed - self._shown_speed) > self._shown_speed * self.REFORMAT_RATIO:
+            self._shown_speed = self.speed
+            self.speed_str = _format_size(self.speed) + "/秒"
+        return self.speed
+    
+    def remaining(self, remaining_size):
+        """
+        按当前速度估算剩余时间
+        
+        Args:
+            remaining_size: 剩余字节数
+            
+        Returns:
+            str: 格式化后的剩余时间
+        """
+        return _format_time(remaining_size / max(self.speed, 1))
 
 
 class Migrator:
     """文件夹迁移器"""
     
+    KERNEL_COPY_CHUNK = 64 * 1024 * 1024  # 内核复制（copy_file_range/sendfile）每次调用的最大字节数
+    COPY_BUFFER_SIZE = 4 * 1024 * 1024  # 普通读写复制的缓冲区大小
+    PIPELINE_DEPTH = 4  # 流水线复制时同时使用的缓冲区数量
+    PROGRESS_COPY_THRESHOLD = 64 * 1024 * 1024  # 超过该大小的文件分块复制并显示进度
+    PARALLEL_COMPRESS_MAX_SIZE = 4 * 1024 * 1024  # 小于该大小的文件由线程池并行读取和压缩
+    COMPRESS_BATCH_SIZE = 32  # 每个压缩任务包含的小文件数量
+    RAW_ZIP_WRITE_VERSIONS = ((3, 7), (3, 13))  # 已核对ZipFile内部写入流程、可直接写入预压缩数据的Python版本范围
+    RESERVE_FILE_NAME = '.migratec.reserve'  # 在目标磁盘上预留迁移空间的占位文件名
+    # 已经压缩过的文件格式，再次压缩几乎不能减小体积，直接存储
+    INCOMPRESSIBLE_EXTENSIONS = frozenset({
+        '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.mkv', '.webm', '.avi', '.mov', '.mp3', '.ogg',
+        '.zip', '.gz', '.xz', '.bz2', '.7z', '.rar', '.zst', '.cab', '.msi',
+        '.docx', '.xlsx', '.pptx', '.odt', '.apk', '.jar', '.whl', '.nupkg'
+    })
+    
     def __init__(self, scan_result_file, target_path, temp_path, mapping_file, max_threads=4,
-                 update_callback=None, progress_callback=None, cpu_limit=0.5, memory_limit=0.5):
+                 update_callback=None, progress_callback=None, cpu_limit=0.5, memory_limit=0.5,
+                 compress_level=0, use_temp_archive=False):
         """
         初始化迁移器
         
@@ -39,6 +176,10 @@ class Migrator:
             progress_callback: 进度回调函数
             cpu_limit: CPU使用限制，范围0-1，表示可使用的CPU核心数比例
             memory_limit: 内存使用限制，范围0-1，表示可使用的系统内存比例
+            compress_level: 临时压缩文件的压缩级别，0表示只存储不压缩，1-9为DEFLATE压缩级别；
+                压缩文件在本机解压后即删除，默认不压缩，目标磁盘较慢时可以调高
+            use_temp_archive: 是否先将文件夹压缩到临时路径再解压到目标路径，
+                仅在临时路径所在磁盘明显快于源磁盘和目标磁盘时才有意义，默认不使用
         """
         self.scan_result_file = scan_result_file
         self.target_path = target_path
@@ -49,12 +190,18 @@ class Migrator:
         self.progress_callback = progress_callback
         self.cpu_limit = cpu_limit
         self.memory_limit = memory_limit
+        self.compress_level = compress_level
+        self.use_temp_archive = use_temp_archive
         self.logger = logging.getLogger('MigrateC.Migrator')
         self.path_mapping = {}  # 路径映射
+        self.type_mapping = {}  # 路径类型映射，值为 'file' 或 'folder'
         self.lock = threading.Lock()  # 线程锁
         self.total_folders = 0  # 总文件夹数
         self.processed_folders = 0  # 已处理文件夹数
         self.is_running = True  # 运行标志
+        self._reserve_fd = None  # 空间预留文件的描述符
+        self._reserve_file = None  # 空间预留文件路径
+        self._reserved_size = 0  # 当前仍预留的字节数
         
         # 创建资源监控器
         self.resource_monitor = ResourceMonitor(
@@ -88,21 +235,17 @@ class Migrator:
                 self.resource_monitor.stop_monitoring()
                 return False
                 
-            # 检查目标磁盘空间是否足够
-            if not self._check_disk_space(scan_result):
-                self.resource_monitor.stop_monitoring()
-                return False
-            
-            # 检查目标磁盘空间是否足够
-            if not self._check_disk_space(scan_result):
-                self.resource_monitor.stop_monitoring()
-                return False
-            
             # 获取大文件夹列表
             large_folders = scan_result.get('large_folders', [])
             # 获取大文件列表
             large_files = scan_result.get('large_files', [])
             
+            # 检查目标磁盘空间是否足够
+            space_ok, total_size = self._check_disk_space(large_folders, large_files)
+            if not space_ok:
+                self.resource_monitor.stop_monitoring()
+                return False
+            
             # 计算总迁移项目数
             self.total_folders = len(large_folders) + len(large_files)
             
@@ -111,7 +254,13 @@ class Migrator:
                 self.resource_monitor.stop_monitoring()
                 return True
             
-            self._update(f"开始迁移 {len(large_folders)} 个大文件夹和 {len(large_files)} 个大文件，总计 {self.total_folders} 项", "任务开始")
+            # 预先占用目标磁盘空间，空间不足时在开始复制前失败
+            if not self._reserve_disk_space(total_size):
+                self.resource_monitor.stop_monitoring()
+                return False
+            
+            self._update(f"开始迁移 {len(large_folders)} 个大文件夹和 {len(large_files)} 个大文件，"
+                         f"总计 {self.total_folders} 项，{_format_size(total_size)}", "任务开始")
             
             # 更新进度
             if self.progress_callback:
@@ -121,39 +270,34 @@ class Migrator:
             max_threads = self.resource_monitor.get_max_threads()
             self._update(f"根据系统资源限制，使用 {max_threads} 个线程进行迁移（最大允许: {self.max_threads}）", "任务配置")
             
-            # 使用线程池迁移文件夹和文件
+            # 使用线程池迁移文件夹和文件，所有任务一次性提交，资源限制在工作线程中检查
             with ThreadPoolExecutor(max_workers=max_threads) as executor:
+                futures = []
+                
                 # 迁移文件夹
                 if large_folders:
                     self._update(f"开始迁移 {len(large_folders)} 个大文件夹", "文件夹迁移")
-                    for folder_info in large_folders:
-                        if not self.is_running:
-                            break
-                        
-                        # 检查资源使用情况，如果资源紧张则等待
-                        while self.is_running and self.resource_monitor.should_throttle():
-                            self._update("系统资源使用率较高，暂停提交新任务...", "资源限制")
-                            if not self.resource_monitor.wait_for_resources(timeout=5):
-                                break
-                        
-                        folder_path = folder_info['path']
-                        executor.submit(self._migrate_folder, folder_path)
+                    futures.extend(executor.submit(self._migrate_item, self._migrate_folder, folder_info.get('size', 0),
+                                                   folder_info['path'], folder_info.get('size', 0))
+                                   for folder_info in large_folders)
                 
                 # 迁移文件
                 if large_files:
                     self._update(f"开始迁移 {len(large_files)} 个大文件", "文件迁移")
-                    for file_info in large_files:
-                        if not self.is_running:
-                            break
-                        
-                        # 检查资源使用情况，如果资源紧张则等待
-                        while self.is_running and self.resource_monitor.should_throttle():
-                            self._update("系统资源使用率较高，暂停提交新任务...", "资源限制")
-                            if not self.resource_monitor.wait_for_resources(timeout=5):
-                                break
-                        
-                        file_path = file_info['path']
-                        executor.submit(self._migrate_file, file_path)
+                    futures.extend(executor.submit(self._migrate_item, self._migrate_file, file_info.get('size', 0),
+                                                   file_info['path'])
+                                   for file_info in large_files)
+                
+                # 等待所有任务完成，并记录未处理的异常
+                wait(futures)
+                for future in futures:
+                    error = future.exception()
+                    if error is not None:
+                        self.logger.error(f"迁移任务出错: {str(error)}", exc_info=error)
+                        self._update(f"迁移任务出错: {str(error)}", "任务错误")
+            
+            # 所有数据已写入，释放剩余的预留空间
+            self._remove_reserved_space()
             
             # 保存映射
             if self.is_running:
@@ -171,6 +315,7 @@ class Migrator:
         except Exception as e:
             self.logger.exception(f"迁移出错: {str(e)}")
             self._update(f"迁移出错: {str(e)}", "任务错误")
+            self._remove_reserved_space()
             self.resource_monitor.stop_monitoring()
             return False
     
@@ -182,15 +327,130 @@ class Migrator:
             dict: 扫描结果
         """
         try:
-            with open(self.scan_result_file, 'r', encoding='utf-8') as f:
-                result = json.load(f)
-                self._update(f"扫描结果加载成功", "数据加载")
-                return result
+            if IJSON_AVAILABLE:
+                result = self._stream_scan_result()
+            else:
+                with open(self.scan_result_file, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+            self._update(f"扫描结果加载成功", "数据加载")
+            return result
         except Exception as e:
             self.logger.exception(f"加载扫描结果出错: {str(e)}")
             self._update(f"加载扫描结果出错: {str(e)}", "数据加载错误")
             return None
     
+    def _stream_scan_result(self):
+        """
+        使用ijson流式解析扫描结果，只保留迁移需要的路径和大小字段
+        
+        Returns:
+            dict: 只包含large_folders和large_files的扫描结果
+        """
+        result = {}
+        with open(self.scan_result_file, 'rb') as f:
+            for key in ('large_folders', 'large_files'):
+                # 每个列表单独流式解析一遍，不在内存中构建整个JSON对象树
+                f.seek(0)
+                result[key] = [{'path': item['path'], 'size': item.get('size', 0)}
+                               for item in ijson.items(f, f'{key}.item', use_float=True)]
+        return result
+    
+    def _migrate_item(self, migrate_func, item_size, *args):
+        """
+        在工作线程中执行迁移任务，资源紧张时先等待
+        
+        Args:
+            migrate_func: 迁移函数
+            item_size: 迁移项目的大小，开始前从预留空间中释放
+            *args: 迁移函数的参数
+        """
+        # 检查资源使用情况，内存接近上限时稍等片刻再开始，超过上限则等待
+        if self.resource_monitor.should_throttle() == MemoryPressure.SLOW:
+            self.resource_monitor.wait_for_resources(timeout=self.resource_monitor.check_interval,
+                                                     level=MemoryPressure.OK)
+        while self.is_running and self.resource_monitor.should_throttle() == MemoryPressure.STOP:
+            self._update("系统资源使用率较高，暂停执行新任务...", "资源限制")
+            if not self.resource_monitor.wait_for_resources(timeout=5):
+                break
+        
+        if not self.is_running:
+            return
+        
+        self._release_reserved_space(item_size)
+        migrate_func(*args)
+    
+    def _reserve_disk_space(self, size):
+        """
+        在目标磁盘上创建占位文件预先占用迁移所需的空间，避免迁移中途被其他程序占满磁盘
+        
+        Args:
+            size: 需要预留的字节数
+            
+        Returns:
+            bool: 空间是否足够，无法创建占位文件时视为足够
+        """
+        reserve_file = os.path.join(self.target_path, self.RESERVE_FILE_NAME)
+        try:
+            fd = os.open(reserve_file, os.O_CREAT | os.O_WRONLY | os.O_TRUNC | getattr(os, 'O_BINARY', 0))
+        except OSError as e:
+            self.logger.warning(f"创建空间预留文件失败: {reserve_file}, {str(e)}")
+            return True
+        
+        try:
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                # Windows上扩展文件长度时NTFS直接分配磁盘空间，不写入数据
+                os.ftruncate(fd, size)
+        except OSError as e:
+            os.close(fd)
+            try:
+                os.remove(reserve_file)
+            except OSError:
+                pass
+            if e.errno == errno.ENOSPC:
+                self._update(f"目标磁盘空间不足，无法预留 {_format_size(size)}", "空间检查")
+                return False
+            self.logger.warning(f"预留目标磁盘空间失败: {str(e)}")
+            return True
+        
+        self._reserve_fd = fd
+        self._reserve_file = reserve_file
+        self._reserved_size = size
+        self.logger.info(f"已在目标磁盘预留 {_format_size(size)} 空间")
+        return True
+    
+    def _release_reserved_space(self, size):
+        """
+        按即将写入的数据量缩小占位文件，把预留的空间让给实际迁移的数据
+        
+        Args:
+            size: 释放的字节数
+        """
+        with self.lock:
+            if self._reserve_fd is None or size <= 0:
+                return
+            self._reserved_size = max(0, self._reserved_size - size)
+            try:
+                os.ftruncate(self._reserve_fd, self._reserved_size)
+            except OSError as e:
+                self.logger.debug(f"缩小空间预留文件出错: {str(e)}")
+    
+    def _remove_reserved_space(self):
+        """
+        关闭并删除空间预留文件
+        """
+        with self.lock:
+            fd, self._reserve_fd = self._reserve_fd, None
+        if fd is None:
+            return
+        
+        os.close(fd)
+        try:
+            os.remove(self._reserve_file)
+        except OSError as e:
+            self.logger.warning(f"删除空间预留文件失败: {self._reserve_file}, {str(e)}")
+    
     def _migrate_file(self, file_path):
         """
         迁移单个文件
@@ -215,10 +475,10 @@ class Migrator:
             os.makedirs(os.path.dirname(target_file), exist_ok=True)
             
             # 复制文件到目标路径
-            self._update(f"开始复制: {file_name} -> {target_file}，大小: {self._format_size(file_size)}", "文件复制")
+            self._update(f"开始复制: {file_name} -> {target_file}，大小: {_format_size(file_size)}", "文件复制")
             
-            # 使用分块复制大文件，并显示进度
-            if file_size > 10 * 1024 * 1024:  # 大于10MB的文件显示进度
+            # 使用分块复制大文件，并显示进度，较小的文件直接使用shutil.copy2
+            if file_size > self.PROGRESS_COPY_THRESHOLD:
                 self._copy_file_with_progress(file_path, target_file, file_size)
             else:
                 shutil.copy2(file_path, target_file)
@@ -226,10 +486,13 @@ class Migrator:
             # 添加到映射
             with self.lock:
                 self.path_mapping[file_path] = target_file
+                self.type_mapping[file_path] = 'file'
                 self.processed_folders += 1
                 progress = int(self.processed_folders / max(1, self.total_folders) * 100)
-                if self.progress_callback and progress <= 100:
-                    self.progress_callback(progress)
+            
+            # 在锁外回调，避免界面更新阻塞其他工作线程
+            if self.progress_callback and progress <= 100:
+                self.progress_callback(progress)
             
             self._update(f"复制完成: {file_name} -> {target_file}", "文件复制")
             
@@ -248,57 +511,47 @@ class Migrator:
         """
         import time
         try:
-            # 分块大小：1MB
-            chunk_size = 1024 * 1024
             copied_size = 0
-            last_progress_time = 0
-            start_time = time.time()  # 记录开始时间
+            last_progress_ns = 0
+            start_ns = time.monotonic_ns()  # 记录开始时间
+            speed_estimator = _SpeedEstimator(start_ns)
             file_name = os.path.basename(src_file)
+            file_size_str = _format_size(file_size)
             
-            with open(src_file, 'rb') as src, open(dst_file, 'wb') as dst:
-                while True:
+            # 不使用Python的缓冲层，数据直接在复制缓冲区和文件之间读写
+            with open(src_file, 'rb', buffering=0) as src, open(dst_file, 'wb', buffering=0) as dst:
+                self._prepare_copy(src, dst, file_size)
+                
+                for copied in self._fast_copy(src, dst):
                     if not self.is_running:
                         return
-                        
-                    # 读取数据块
-                    chunk = src.read(chunk_size)
-                    if not chunk:
-                        break
-                        
-                    # 写入数据块
-                    dst.write(chunk)
                     
                     # 更新进度
-                    copied_size += len(chunk)
+                    copied_size += copied
                     
-                    # 每秒最多更新一次进度，避免频繁更新
-                    current_time = self._get_current_time_ms()
-                    if current_time - last_progress_time > 1000 or copied_size == file_size:
+                    # 每秒最多更新一次进度，避免频繁更新，不更新时不做任何格式化
+                    now_ns = time.monotonic_ns()
+                    if now_ns - last_progress_ns > 1_000_000_000 or copied_size == file_size:
                         progress_percent = int(copied_size / file_size * 100)
                         
                         # 计算预估剩余时间
-                        elapsed_time = time.time() - start_time
-                        if copied_size > 0 and elapsed_time > 0:
-                            speed = copied_size / elapsed_time  # 字节/秒
-                            remaining_size = file_size - copied_size
-                            if speed > 0:
-                                remaining_time = remaining_size / speed
-                                remaining_str = self._format_time(remaining_time)
-                                speed_str = self._format_size(speed) + "/秒"
-                                
-                                self._update(f"{file_name}: {self._format_size(copied_size)}/{self._format_size(file_size)} ({progress_percent}%)，"
-                                           f"速度: {speed_str}，剩余: {remaining_str}", "文件复制进度")
-                            else:
-                                self._update(f"{file_name}: {self._format_size(copied_size)}/{self._format_size(file_size)} ({progress_percent}%)", "文件复制进度")
+                        if speed_estimator.update(now_ns, copied_size) > 0:
+                            self._update(f"{file_name}: {_format_size(copied_size)}/{file_size_str} ({progress_percent}%)，"
+                                       f"速度: {speed_estimator.speed_str}，"
+                                       f"剩余: {speed_estimator.remaining(file_size - copied_size)}", "文件复制进度")
                         else:
-                            self._update(f"{file_name}: {self._format_size(copied_size)}/{self._format_size(file_size)} ({progress_percent}%)", "文件复制进度")
+                            self._update(f"{file_name}: {_format_size(copied_size)}/{file_size_str} ({progress_percent}%)", "文件复制进度")
                             
-                        last_progress_time = current_time
+                        last_progress_ns = now_ns
+                
+                # 文件在复制过程中变小时，去掉预分配的多余部分
+                if copied_size != file_size:
+                    dst.truncate(copied_size)
             
             # 计算总耗时
-            total_time = time.time() - start_time
-            time_str = self._format_time(total_time)
-            self._update(f"{file_name} 复制完成，大小: {self._format_size(file_size)}，耗时: {time_str}", "文件复制完成")
+            total_time = (time.monotonic_ns() - start_ns) / 1e9
+            time_str = _format_time(total_time)
+            self._update(f"{file_name} 复制完成，大小: {file_size_str}，耗时: {time_str}", "文件复制完成")
             
             # 复制文件属性
             shutil.copystat(src_file, dst_file)
@@ -308,12 +561,143 @@ class Migrator:
             self._update(f"{file_name} 复制失败: {str(e)}", "文件复制错误")
             raise
     
-    def _migrate_folder(self, folder_path):
+    def _prepare_copy(self, src, dst, file_size):
+        """
+        复制前预先分配目标文件空间，并提示系统按顺序读取源文件
+        
+        预先分配可以让文件系统一次分配连续的空间，减少碎片和元数据更新
+        
+        Args:
+            src: 已打开的源文件对象
+            dst: 已打开的目标文件对象
+            file_size: 文件大小
+        """
+        try:
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(dst.fileno(), 0, file_size)
+            elif os.name == 'nt':
+                # 设置文件结尾即可让NTFS一次分配空间；不使用SetFileValidData，
+                # 它需要SE_MANAGE_VOLUME_NAME权限，且会使磁盘上的旧数据可被读取
+                dst.truncate(file_size)
+        except OSError as e:
+            # 部分文件系统（如FAT、tmpfs）不支持预分配，不影响复制
+            self.logger.debug(f"预分配文件空间失败: {str(e)}")
+        
+        if hasattr(os, 'posix_fadvise'):
+            try:
+                os.posix_fadvise(src.fileno(), 0, file_size, os.POSIX_FADV_SEQUENTIAL)
+            except OSError as e:
+                self.logger.debug(f"设置顺序读取提示失败: {str(e)}")
+    
+    def _fast_copy(self, src, dst):
+        """
+        复制文件内容，优先使用内核复制，避免数据在内核与用户空间之间来回拷贝
+        
+        依次尝试 copy_file_range（同一文件系统内由内核直接复制）、sendfile（Linux），
+        都不可用时使用预分配缓冲区的流水线读写
+        
+        Args:
+            src: 已打开的源文件对象
+            dst: 已打开的目标文件对象
+            
+        Yields:
+            int: 每次复制的字节数
+        """
+        src_fd = src.fileno()
+        dst_fd = dst.fileno()
+        
+        # 不支持时回退到下一种方式，文件位置已随已复制的数据更新，可以直接继续
+        fallback_errors = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF,
+                           errno.EOPNOTSUPP, errno.ENOTSUP)
+        
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while True:
+                    copied = os.copy_file_range(src_fd, dst_fd, self.KERNEL_COPY_CHUNK)
+                    if not copied:
+                        return
+                    yield copied
+            except OSError as e:
+                if e.errno not in fallback_errors:
+                    raise
+                self.logger.debug(f"copy_file_range不可用，尝试其他复制方式: {str(e)}")
+        
+        if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+            try:
+                while True:
+                    copied = os.sendfile(dst_fd, src_fd, None, self.KERNEL_COPY_CHUNK)
+                    if not copied:
+                        return
+                    yield copied
+            except OSError as e:
+                if e.errno not in fallback_errors:
+                    raise
+                self.logger.debug(f"sendfile不可用，使用普通读写复制: {str(e)}")
+        
+        # 普通读写，读取和写入在两个线程中流水线进行
+        yield from self._pipelined_copy(src, dst)
+    
+    def _pipelined_copy(self, src, dst):
+        """
+        流水线复制：读取线程提前读取后续数据块，当前线程同时写入已读取的数据块，
+        使读写请求可以同时进行，缓冲区只分配一次并循环使用
+        
+        Args:
+            src: 已打开的源文件对象
+            dst: 已打开的目标文件对象
+            
+        Yields:
+            int: 每次复制的字节数
+        """
+        buffers = [bytearray(self.COPY_BUFFER_SIZE) for _ in range(self.PIPELINE_DEPTH)]
+        free_buffers = queue.Queue()
+        filled_buffers = queue.Queue()
+        for index in range(self.PIPELINE_DEPTH):
+            free_buffers.put(index)
+        
+        def read_worker():
+            try:
+                while True:
+                    index = free_buffers.get()
+                    if index is None:
+                        return
+                    copied = src.readinto(buffers[index])
+                    filled_buffers.put((index, copied, None))
+                    if not copied:
+                        return
+            except Exception as e:
+                filled_buffers.put((None, 0, e))
+        
+        reader = threading.Thread(target=read_worker, name='CopyReader', daemon=True)
+        reader.start()
+        try:
+            while True:
+                index, copied, error = filled_buffers.get()
+                if error is not None:
+                    raise error
+                if not copied:
+                    return
+                
+                # 无缓冲写入可能只写入部分数据，循环直到全部写入
+                view = memoryview(buffers[index])
+                written = 0
+                while written < copied:
+                    written += dst.write(view[written:copied])
+                view.release()
+                free_buffers.put(index)
+                yield copied
+        finally:
+            # 复制提前结束（取消或出错）时通知读取线程退出
+            free_buffers.put(None)
+            reader.join()
+    
+    def _migrate_folder(self, folder_path, folder_size=0):
         """
         迁移文件夹
         
         Args:
             folder_path: 文件夹路径
+            folder_size: 扫描时得到的文件夹大小，用于显示复制进度
         """
         try:
             if not os.path.exists(folder_path):
@@ -328,37 +712,46 @@ class Migrator:
             relative_path = self._get_relative_path(folder_path)
             target_folder = os.path.join(self.target_path, relative_path)
             
-            # 构建临时压缩文件路径
-            zip_file = os.path.join(self.temp_path, f"{folder_name}.zip")
-            
-            # 压缩文件夹
-            self._update(f"开始压缩文件夹: {folder_name} ({folder_path})", "文件夹压缩")
-            if not self._compress_folder(folder_path, zip_file):
-                return
-            
-            # 创建目标文件夹
+            # 创建目标文件夹的上级目录
             os.makedirs(os.path.dirname(target_folder), exist_ok=True)
             
-            # 解压文件到目标路径
-            self._update(f"开始解压文件夹: {folder_name} 到 {target_folder}", "文件夹解压")
-            if not self._extract_zip(zip_file, os.path.dirname(target_folder)):
-                return
+            moved = False
+            if not os.path.exists(target_folder) and self._is_same_device(folder_path, self.target_path):
+                # 源路径和目标路径位于同一磁盘时直接重命名，不需要复制数据
+                self._update(f"源路径和目标路径位于同一磁盘，直接移动: {folder_name} -> {target_folder}", "文件夹移动")
+                try:
+                    os.rename(folder_path, target_folder)
+                    moved = True
+                except OSError as e:
+                    self.logger.warning(f"移动文件夹出错，改为复制: {folder_path}, {str(e)}")
+                    self._update(f"移动文件夹失败，改为复制: {folder_name}, {str(e)}", "文件夹移动")
             
-            # 删除临时压缩文件
-            try:
-                os.remove(zip_file)
-                self._update(f"已删除临时压缩文件: {zip_file}", "清理临时文件")
-            except Exception as e:
-                self.logger.warning(f"删除临时压缩文件出错: {zip_file}, {str(e)}")
-                self._update(f"删除临时文件失败: {zip_file}, {str(e)}", "清理临时文件")
+            if not moved:
+                if self.use_temp_archive:
+                    # 按配置先压缩到临时路径再解压
+                    if not self._migrate_folder_via_zip(folder_path, target_folder):
+                        return
+                elif self._is_network_path(folder_path) or self._is_network_path(self.target_path):
+                    # 网络位置上逐个文件复制的延迟较高，读取和写入通过管道同时进行
+                    self._update(f"开始传输文件夹: {folder_name} ({folder_path}) -> {target_folder}", "文件夹传输")
+                    if not self._pipe_folder(folder_path, target_folder, folder_size):
+                        return
+                else:
+                    # 本地磁盘之间直接逐个文件复制，不经过临时压缩文件
+                    self._update(f"开始复制文件夹: {folder_name} ({folder_path}) -> {target_folder}", "文件夹复制")
+                    if not self._copy_folder(folder_path, target_folder, folder_size):
+                        return
             
             # 添加到映射
             with self.lock:
                 self.path_mapping[folder_path] = target_folder
+                self.type_mapping[folder_path] = 'folder'
                 self.processed_folders += 1
                 progress = int(self.processed_folders / max(1, self.total_folders) * 100)
-                if self.progress_callback and progress <= 100:
-                    self.progress_callback(progress)
+            
+            # 在锁外回调，避免界面更新阻塞其他工作线程
+            if self.progress_callback and progress <= 100:
+                self.progress_callback(progress)
             
             self._update(f"文件夹迁移完成: {folder_name} ({folder_path}) -> {target_folder}", "文件夹迁移")
             
@@ -366,6 +759,248 @@ class Migrator:
             self.logger.exception(f"迁移文件夹出错: {folder_path}, {str(e)}")
             self._update(f"文件夹迁移失败: {folder_name} ({folder_path}), 错误: {str(e)}", "文件夹迁移错误")
     
+    def _migrate_folder_via_zip(self, folder_path, target_folder):
+        """
+        通过临时压缩文件迁移文件夹：先压缩到临时路径，再解压到目标路径
+        
+        Args:
+            folder_path: 文件夹路径
+            target_folder: 目标文件夹路径
+            
+        Returns:
+            bool: 是否成功
+        """
+        folder_name = os.path.basename(folder_path)
+        
+        # 构建临时压缩文件路径
+        zip_file = os.path.join(self.temp_path, f"{folder_name}.zip")
+        
+        # 压缩文件夹
+        self._update(f"开始压缩文件夹: {folder_name} ({folder_path})", "文件夹压缩")
+        if not self._compress_folder(folder_path, zip_file):
+            return False
+        
+        # 解压文件到目标路径
+        self._update(f"开始解压文件夹: {folder_name} 到 {target_folder}", "文件夹解压")
+        if not self._extract_zip(zip_file, os.path.dirname(target_folder)):
+            return False
+        
+        # 删除临时压缩文件
+        try:
+            os.remove(zip_file)
+            self._update(f"已删除临时压缩文件: {zip_file}", "清理临时文件")
+        except Exception as e:
+            self.logger.warning(f"删除临时压缩文件出错: {zip_file}, {str(e)}")
+            self._update(f"删除临时文件失败: {zip_file}, {str(e)}", "清理临时文件")
+        
+        return True
+    
+    def _pipe_folder(self, folder_path, target_folder, folder_size=0):
+        """
+        通过管道传输文件夹：写入线程将文件夹打包为tar数据流写入管道，
+        当前线程同时从管道读取并解包到目标路径，不生成临时文件
+        
+        Args:
+            folder_path: 文件夹路径
+            target_folder: 目标文件夹路径
+            folder_size: 扫描时得到的文件夹大小，用于计算进度，为0时只显示已传输的大小
+            
+        Returns:
+            bool: 是否成功
+        """
+        import time
+        folder_name = os.path.basename(folder_path)
+        target_dir = os.path.dirname(target_folder)
+        os.makedirs(target_dir, exist_ok=True)
+        
+        read_fd, write_fd = os.pipe()
+        writer_errors = []
+        
+        def write_worker():
+            try:
+                with os.fdopen(write_fd, 'wb', buffering=self.COPY_BUFFER_SIZE) as pipe_w, \
+                        tarfile.open(fileobj=pipe_w, mode='w|') as tar:
+                    tar.add(folder_path, arcname=folder_name)
+            except Exception as e:
+                writer_errors.append(e)
+        
+        writer = threading.Thread(target=write_worker, name='TarWriter', daemon=True)
+        writer.start()
+        
+        processed_files = 0
+        processed_size = 0
+        last_progress_ns = 0
+        update_interval_ns = 300_000_000  # 每300毫秒更新一次进度
+        start_ns = time.monotonic_ns()  # 记录开始时间
+        folder_size_str = _format_size(folder_size)
+        # 支持解包过滤器的版本上使用tar过滤器，阻止解包到目标目录之外
+        extract_args = {'filter': 'tar'} if hasattr(tarfile, 'tar_filter') else {}
+        
+        try:
+            with os.fdopen(read_fd, 'rb', buffering=self.COPY_BUFFER_SIZE) as pipe_r, \
+                    tarfile.open(fileobj=pipe_r, mode='r|') as tar:
+                for member in tar:
+                    # 如果任务被取消，则立即返回，关闭管道后写入线程随之结束
+                    if not self.is_running:
+                        return False
+                    
+                    tar.extract(member, target_dir, **extract_args)
+                    if not member.isfile():
+                        continue
+                    
+                    # 更新进度
+                    processed_files += 1
+                    processed_size += member.size
+                    
+                    now_ns = time.monotonic_ns()
+                    if now_ns - last_progress_ns > update_interval_ns:
+                        if folder_size > 0:
+                            progress_percent = min(int(processed_size / folder_size * 100), 99)
+                            self._update(f"{folder_name}: {processed_files} 文件，已传输 {_format_size(processed_size)}/"
+                                         f"{folder_size_str} ({progress_percent}%)", "文件夹传输进度")
+                            
+                            # 更新总体进度条
+                            if self.progress_callback:
+                                folder_progress = int(self.processed_folders / max(1, self.total_folders) * 100)
+                                sub_progress = int(progress_percent / max(1, self.total_folders))
+                                self.progress_callback(min(folder_progress + sub_progress, 99))
+                        else:
+                            self._update(f"{folder_name}: {processed_files} 文件，已传输 {_format_size(processed_size)}", "文件夹传输进度")
+                        last_progress_ns = now_ns
+        finally:
+            writer.join()
+        
+        if writer_errors:
+            raise writer_errors[0]
+        
+        # 计算总耗时
+        time_str = _format_time((time.monotonic_ns() - start_ns) / 1e9)
+        self._update(f"{folder_name} 传输完成: {processed_files} 个文件，大小 {_format_size(processed_size)}，耗时: {time_str}", "文件夹传输完成")
+        return True
+    
+    def _copy_folder(self, folder_path, target_folder, folder_size=0):
+        """
+        逐个文件将文件夹直接复制到目标路径，保持目录结构
+        
+        Args:
+            folder_path: 文件夹路径
+            target_folder: 目标文件夹路径
+            folder_size: 扫描时得到的文件夹大小，用于计算进度，为0时只显示已复制的大小
+            
+        Returns:
+            bool: 是否所有文件都复制成功
+        """
+        import time
+        folder_name = os.path.basename(folder_path)
+        processed_files = 0
+        processed_size = 0
+        failed_files = 0
+        last_progress_ns = 0
+        update_interval_ns = 300_000_000  # 每300毫秒更新一次进度
+        start_ns = time.monotonic_ns()  # 记录开始时间
+        folder_size_str = _format_size(folder_size)
+        
+        # 使用栈遍历目录，scandir返回的条目自带文件类型，减少stat调用
+        stack = [(folder_path, target_folder)]
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            os.makedirs(dst_dir, exist_ok=True)
+            
+            with os.scandir(src_dir) as it:
+                for entry in it:
+                    # 如果任务被取消，则立即返回
+                    if not self.is_running:
+                        return False
+                    
+                    dst_path = os.path.join(dst_dir, entry.name)
+                    try:
+                        # 与os.walk一致，不进入目录的符号链接
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, dst_path))
+                            continue
+                        if not entry.is_file():
+                            continue
+                        
+                        file_size = entry.stat().st_size
+                        if file_size > self.PROGRESS_COPY_THRESHOLD:
+                            self._copy_file_with_progress(entry.path, dst_path, file_size)
+                        else:
+                            shutil.copy2(entry.path, dst_path)
+                    except Exception as e:
+                        failed_files += 1
+                        self.logger.warning(f"复制文件出错: {entry.path}, {str(e)}")
+                        self._update(f"复制文件失败: {entry.path}, {str(e)}", "文件复制错误")
+                        continue
+                    
+                    # 更新进度
+                    processed_files += 1
+                    processed_size += file_size
+                    
+                    now_ns = time.monotonic_ns()
+                    if now_ns - last_progress_ns > update_interval_ns:
+                        if folder_size > 0:
+                            progress_percent = min(int(processed_size / folder_size * 100), 99)
+                            self._update(f"{folder_name}: {processed_files} 文件，已复制 {_format_size(processed_size)}/"
+                                         f"{folder_size_str} ({progress_percent}%)", "文件夹复制进度")
+                            
+                            # 更新总体进度条
+                            if self.progress_callback:
+                                folder_progress = int(self.processed_folders / max(1, self.total_folders) * 100)
+                                sub_progress = int(progress_percent / max(1, self.total_folders))
+                                self.progress_callback(min(folder_progress + sub_progress, 99))
+                        else:
+                            self._update(f"{folder_name}: {processed_files} 文件，已复制 {_format_size(processed_size)}", "文件夹复制进度")
+                        last_progress_ns = now_ns
+        
+        if not self.is_running:
+            return False
+        
+        # 计算总耗时
+        time_str = _format_time((time.monotonic_ns() - start_ns) / 1e9)
+        if failed_files:
+            self._update(f"{folder_name} 复制未完成: {failed_files} 个文件复制失败，已复制 {processed_files} 个文件，耗时: {time_str}", "文件夹复制错误")
+            return False
+        
+        self._update(f"{folder_name} 复制完成: {processed_files} 个文件，大小 {_format_size(processed_size)}，耗时: {time_str}", "文件夹复制完成")
+        return True
+    
+    def _is_same_device(self, path1, path2):
+        """
+        判断两个路径是否位于同一磁盘
+        
+        Args:
+            path1: 路径1
+            path2: 路径2
+            
+        Returns:
+            bool: 是否位于同一磁盘
+        """
+        try:
+            return os.stat(path1).st_dev == os.stat(path2).st_dev
+        except OSError:
+            return False
+    
+    def _is_network_path(self, path):
+        """
+        判断路径是否位于网络位置
+        
+        Args:
+            path: 路径
+            
+        Returns:
+            bool: 是否为网络路径
+        """
+        path = os.path.abspath(path)
+        if path.startswith('\\\\') or path.startswith('//'):
+            return True
+        
+        if os.name == 'nt':
+            import ctypes
+            drive = os.path.splitdrive(path)[0]
+            # DRIVE_REMOTE = 4，映射的网络驱动器
+            return bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == 4
+        return False
+    
     def _get_relative_path(self, folder_path):
         """
         获取相对路径
@@ -401,102 +1036,88 @@ class Migrator:
             # 获取当前资源使用情况和最大线程数
             max_threads = self.resource_monitor.get_max_threads()
             
-            # 先统计文件总数和总大小，用于显示进度
-            total_files = 0
-            total_size = 0
-            file_list = []
-            scanned_dirs = 0
-            last_scan_update_time = 0
-            start_time = time.time()  # 记录开始时间
+            start_ns = time.monotonic_ns()  # 记录开始时间
+            speed_estimator = _SpeedEstimator(start_ns)
             folder_name = os.path.basename(folder_path)
             
-            self._update(f"开始统计: {folder_name} 中的文件数量和大小...", "文件夹扫描")
-            for root, dirs, files in os.walk(folder_path):
-                if not self.is_running:
-                    return False
-                
-                # 更新扫描进度
-                scanned_dirs += 1
-                current_time = self._get_current_time_ms()
-                if current_time - last_scan_update_time > 300:  # 每300毫秒更新一次扫描进度
-                    self._update(f"{folder_name}: 已扫描 {scanned_dirs} 个目录，找到 {total_files} 个文件，总大小 {self._format_size(total_size)}", "文件夹扫描")
-                    last_scan_update_time = current_time
-                    
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_size = os.path.getsize(file_path)
-                        rel_path = os.path.relpath(root, os.path.dirname(folder_path))
-                        arcname = os.path.join(rel_path, file)
-                        file_list.append((file_path, arcname, file_size))
-                        total_files += 1
-                        total_size += file_size
-                    except Exception as e:
-                        self.logger.warning(f"获取文件信息出错: {file_path}, {str(e)}")
-                        self._update(f"获取文件信息失败: {file_path}, {str(e)}", "文件夹扫描错误")
+            # 遍历和压缩同时进行：遍历线程将文件放入队列并统计总数，压缩从第一个文件开始，
+            # 统计完成前只显示已处理的数量，完成后显示百分比
+            file_queue = queue.Queue()
+            totals = {'files': 0, 'size': 0, 'done': False}
+            walker = threading.Thread(target=self._walk_zip_files, args=(folder_path, file_queue, totals),
+                                      name='ZipWalker', daemon=True)
+            walker.start()
             
-            if total_files == 0:
-                self._update(f"文件夹 {folder_name} 中没有文件", "文件夹扫描")
-                return True
-                
-            self._update(f"开始压缩: {folder_name}，共 {total_files} 个文件，总大小 {self._format_size(total_size)}", "文件夹压缩")
+            self._update(f"开始压缩: {folder_name}，正在统计文件数量和大小...", "文件夹压缩")
             
             # 创建压缩文件
             processed_files = 0
             processed_size = 0
-            last_progress_time = 0  # 上次更新进度的时间
-            last_file_update_time = 0  # 上次更新文件名的时间
-            update_interval = 300  # 更新间隔降低到300毫秒
+            last_progress_ns = 0  # 上次更新进度的时间
+            last_file_update_ns = 0  # 上次更新文件名的时间
+            update_interval_ns = 300_000_000  # 每300毫秒更新一次进度
+            file_update_interval_ns = 500_000_000  # 每500毫秒更新一次当前处理的文件
+            total_size_str = None  # 统计完成后缓存总大小的格式化结果
+            
+            # 压缩级别为0时只存储，避免在本机临时文件上浪费CPU压缩
+            if self.compress_level > 0:
+                zip_args = {'compression': zipfile.ZIP_DEFLATED, 'compresslevel': self.compress_level}
+            else:
+                zip_args = {'compression': zipfile.ZIP_STORED}
             
-            with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # 添加文件到压缩文件
-                for file_path, arcname, file_size in file_list:
+            with zipfile.ZipFile(zip_file, 'w', allowZip64=True, **zip_args) as zipf, \
+                    ThreadPoolExecutor(max_workers=max_threads) as executor:
+                # 添加文件到压缩文件，小文件由线程池并行读取和压缩（zlib压缩时会释放GIL），
+                # 主线程按顺序写入压缩文件
+                for file_path, file_size, error in self._write_zip_entries(zipf, executor, iter(file_queue.get, None),
+                                                                          max_threads):
                     # 如果任务被取消，则立即返回
                     if not self.is_running:
                         return False
                     
                     try:
+                        if error is not None:
+                            raise error
+                        
+                        # 每次循环只取一次时间，不需要更新时不做任何格式化
+                        now_ns = time.monotonic_ns()
+                        
                         # 显示当前正在处理的文件名和大小
-                        current_time = self._get_current_time_ms()
-                        if current_time - last_file_update_time > 500:  # 每500毫秒更新一次当前处理的文件
+                        if now_ns - last_file_update_ns > file_update_interval_ns:
                             file_name = os.path.basename(file_path)
-                            formatted_size = self._format_size(file_size)
-                            self._update(f"正在压缩: {file_name} ({processed_files+1}/{total_files})，大小: {formatted_size}", "文件压缩")
-                            last_file_update_time = current_time
-                            
-                        # 添加文件到压缩文件
-                        zipf.write(file_path, arcname)
+                            formatted_size = _format_size(file_size)
+                            total_str = f"/{totals['files']}" if totals['done'] else ""
+                            self._update(f"正在压缩: {file_name} ({processed_files+1}{total_str})，大小: {formatted_size}", "文件压缩")
+                            last_file_update_ns = now_ns
                         
                         # 更新进度
                         processed_files += 1
                         processed_size += file_size
                         
-                        # 降低更新间隔，提高进度更新频率
-                        current_time = self._get_current_time_ms()
-                        if current_time - last_progress_time > update_interval or processed_files == total_files:
-                            progress_percent = int(processed_size / total_size * 100)
+                        walk_done = totals['done']
+                        total_files = totals['files']
+                        total_size = totals['size']
+                        if now_ns - last_progress_ns > update_interval_ns or (walk_done and processed_files == total_files):
+                            last_progress_ns = now_ns
+                            if not walk_done:
+                                # 统计尚未完成，总数未知
+                                self._update(f"{folder_name}: 已压缩 {processed_files} 个文件，已处理 {_format_size(processed_size)}"
+                                             f"（已找到 {total_files} 个文件，统计中）", "文件夹压缩进度")
+                                continue
+                            
+                            progress_percent = int(processed_size / max(1, total_size) * 100)
+                            if total_size_str is None:
+                                total_size_str = _format_size(total_size)
                             
                             # 计算预估剩余时间
-                            elapsed_time = time.time() - start_time
-                            if processed_size > 0 and elapsed_time > 0:
-                                speed = processed_size / elapsed_time  # 字节/秒
-                                remaining_size = total_size - processed_size
-                                if speed > 0:
-                                    remaining_time = remaining_size / speed
-                                    remaining_str = self._format_time(remaining_time)
-                                    speed_str = self._format_size(speed) + "/秒"
-                                    
-                                    self._update(f"{folder_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
-                                               f"已处理 {self._format_size(processed_size)}/{self._format_size(total_size)}，"
-                                               f"速度: {speed_str}，剩余: {remaining_str}", "文件夹压缩进度")
-                                else:
-                                    self._update(f"{folder_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
-                                               f"已处理 {self._format_size(processed_size)}/{self._format_size(total_size)}", "文件夹压缩进度")
+                            if speed_estimator.update(now_ns, processed_size) > 0:
+                                self._update(f"{folder_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
+                                           f"已处理 {_format_size(processed_size)}/{total_size_str}，"
+                                           f"速度: {speed_estimator.speed_str}，"
+                                           f"剩余: {speed_estimator.remaining(total_size - processed_size)}", "文件夹压缩进度")
                             else:
                                 self._update(f"{folder_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
-                                           f"已处理 {self._format_size(processed_size)}/{self._format_size(total_size)}", "文件夹压缩进度")
-                                
-                            last_progress_time = current_time
+                                           f"已处理 {_format_size(processed_size)}/{total_size_str}", "文件夹压缩进度")
                             
                             # 更新总体进度条
                             if self.progress_callback:
@@ -509,15 +1130,294 @@ class Migrator:
                         self._update(f"压缩文件失败: {os.path.basename(file_path)}, {str(e)}", "文件压缩错误")
             
             # 计算总耗时
-            total_time = time.time() - start_time
-            time_str = self._format_time(total_time)
-            self._update(f"{folder_name} 压缩完成: {processed_files}/{total_files} 文件，大小 {self._format_size(processed_size)}，耗时: {time_str}", "文件夹压缩完成")
+            total_time = (time.monotonic_ns() - start_ns) / 1e9
+            time_str = _format_time(total_time)
+            self._update(f"{folder_name} 压缩完成: {processed_files}/{totals['files']} 文件，大小 {_format_size(processed_size)}，耗时: {time_str}", "文件夹压缩完成")
             return True
         except Exception as e:
             self.logger.exception(f"压缩文件夹出错: {folder_path}, {str(e)}")
             self._update(f"压缩文件夹失败: {os.path.basename(folder_path)}, 错误: {str(e)}", "文件夹压缩错误")
             return False
     
+    def _walk_zip_files(self, folder_path, file_queue, totals):
+        """
+        遍历文件夹，将待压缩的文件放入队列并统计文件总数和总大小，在单独的线程中执行
+        
+        Args:
+            folder_path: 文件夹路径
+            file_queue: 文件队列，元素为 (文件路径, 压缩文件内路径, 文件大小)，遍历结束时放入None
+            totals: 统计结果，遍历结束时 'done' 置为True
+        """
+        try:
+            for file_path, arcname, file_size in self._iter_files(folder_path):
+                if not self.is_running:
+                    return
+                
+                totals['files'] += 1
+                totals['size'] += file_size
+                file_queue.put((file_path, arcname, file_size))
+        except Exception as e:
+            self.logger.warning(f"遍历文件夹出错: {folder_path}, {str(e)}")
+            self._update(f"遍历文件夹失败: {folder_path}, {str(e)}", "文件夹扫描错误")
+        finally:
+            totals['done'] = True
+            file_queue.put(None)
+    
+    def _iter_files(self, folder_path):
+        """
+        遍历文件夹中的所有文件
+        
+        使用scandir直接取得条目的完整路径和文件信息（Windows上在遍历目录时已一并返回），
+        压缩文件内路径通过截取字符串得到，不再逐个拼接和计算相对路径
+        
+        Args:
+            folder_path: 文件夹路径
+            
+        Yields:
+            tuple: (文件路径, 压缩文件内路径, 文件大小)，压缩文件内路径以文件夹名称开头
+        """
+        base_len = len(os.path.dirname(folder_path))
+        stack = [folder_path]
+        while stack:
+            dir_path = stack.pop()
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        try:
+                            # 与os.walk一致，不进入目录的符号链接
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file():
+                                yield entry.path, entry.path[base_len:].lstrip(os.sep), entry.stat().st_size
+                        except OSError as e:
+                            self.logger.warning(f"获取文件信息出错: {entry.path}, {str(e)}")
+                            self._update(f"获取文件信息失败: {entry.path}, {str(e)}", "文件夹扫描错误")
+            except OSError as e:
+                self.logger.warning(f"读取目录出错: {dir_path}, {str(e)}")
+                self._update(f"读取目录失败: {dir_path}, {str(e)}", "文件夹扫描错误")
+    
+    def _write_zip_entries(self, zipf, executor, file_list, max_threads):
+        """
+        将文件写入压缩文件，小文件分批提交到线程池读取和压缩，大文件由zipfile流式写入
+        
+        当前Python版本不支持直接写入预压缩数据时，线程池只负责读取，压缩交由zipfile完成
+        
+        Args:
+            zipf: 已打开的压缩文件
+            executor: 线程池
+            file_list: (文件路径, 压缩文件内路径, 文件大小) 的可迭代对象
+            max_threads: 最大线程数，用于限制同时在内存中的压缩任务数量
+            
+        Yields:
+            tuple: (文件路径, 文件大小, 错误)，写入成功时错误为None
+        """
+        # 按顺序排队的任务，元素为小文件批次的Future或单个大文件
+        pending = deque()
+        batch = []
+        window = max_threads * 2
+        precompress = self._can_write_raw_entry(zipf)
+        if not precompress:
+            self.logger.info(f"当前Python版本 {sys.version_info[0]}.{sys.version_info[1]} 不支持写入预压缩数据，小文件由主线程压缩")
+        
+        for item in file_list:
+            if item[2] >= self.PARALLEL_COMPRESS_MAX_SIZE:
+                if batch:
+                    pending.append(executor.submit(self._read_batch, batch, precompress))
+                    batch = []
+                pending.append(item)
+            else:
+                batch.append(item)
+                if len(batch) >= self.COMPRESS_BATCH_SIZE:
+                    pending.append(executor.submit(self._read_batch, batch, precompress))
+                    batch = []
+            
+            # 限制排队的任务数量，避免压缩结果占用过多内存
+            while len(pending) > window:
+                yield from self._write_zip_job(zipf, pending.popleft())
+        
+        if batch:
+            pending.append(executor.submit(self._read_batch, batch, precompress))
+        while pending:
+            yield from self._write_zip_job(zipf, pending.popleft())
+    
+    def _write_zip_job(self, zipf, job):
+        """
+        将一个压缩任务的结果写入压缩文件
+        
+        Args:
+            zipf: 已打开的压缩文件
+            job: 小文件批次的Future，或 (文件路径, 压缩文件内路径, 文件大小) 表示的大文件
+            
+        Yields:
+            tuple: (文件路径, 文件大小, 错误)，写入成功时错误为None
+        """
+        if isinstance(job, tuple):
+            # 大文件分块读取和压缩，避免整个文件读入内存
+            file_path, arcname, file_size = job
+            try:
+                self._write_large_entry(zipf, file_path, arcname)
+            except Exception as e:
+                yield file_path, file_size, e
+                return
+            yield file_path, file_size, None
+            return
+        
+        for zinfo, data, file_path, file_size, error in job.result():
+            if error is None:
+                try:
+                    if zinfo.compress_size:
+                        # 线程池已完成压缩和CRC计算，直接写入
+                        self._write_raw_entry(zipf, zinfo, data)
+                    else:
+                        # 由zipfile完成压缩、CRC计算和文件头写入
+                        compresslevel = self.compress_level if zinfo.compress_type == zipfile.ZIP_DEFLATED else None
+                        zipf.writestr(zinfo, data, compresslevel=compresslevel)
+                except Exception as e:
+                    error = e
+            yield file_path, file_size, error
+    
+    def _write_large_entry(self, zipf, file_path, arcname):
+        """
+        分块将大文件写入压缩文件
+        
+        ZipFile.write每次只读取8KB，这里使用复制缓冲区分块读取，
+        CRC和压缩在写入同一块数据时一并完成，缓冲区只分配一次。
+        Python 3.13之前ZipInfo不能指定压缩级别，需要压缩的文件仍交由ZipFile.write按8KB分块写入，
+        只有直接存储的文件和Python 3.13及以上版本使用复制缓冲区
+        
+        Args:
+            zipf: 已打开的压缩文件
+            file_path: 文件路径
+            arcname: 压缩文件内路径
+        """
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        if self._should_compress(arcname):
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            if not hasattr(zinfo, 'compress_level'):
+                # Python 3.13之前ZipInfo没有公开的压缩级别属性，交由ZipFile.write按指定级别压缩
+                zipf.write(file_path, arcname, compress_type=zipfile.ZIP_DEFLATED, compresslevel=self.compress_level)
+                return
+            zinfo.compress_level = self.compress_level
+        else:
+            zinfo.compress_type = zipfile.ZIP_STORED
+        
+        buf = bytearray(self.COPY_BUFFER_SIZE)
+        view = memoryview(buf)
+        with open(file_path, 'rb', buffering=0) as src, zipf.open(zinfo, 'w') as dst:
+            while True:
+                copied = src.readinto(buf)
+                if not copied:
+                    break
+                dst.write(view[:copied])
+    
+    def _read_batch(self, batch, precompress):
+        """
+        读取并压缩一批小文件，在线程池中执行
+        
+        Args:
+            batch: (文件路径, 压缩文件内路径, 文件大小) 列表
+            precompress: 是否在线程池中完成压缩和CRC计算，为False时只读取文件内容
+            
+        Returns:
+            list: (ZipInfo, 压缩后的数据或文件内容, 文件路径, 文件大小, 错误) 列表
+        """
+        results = []
+        for file_path, arcname, file_size in batch:
+            try:
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                zinfo.compress_type = zipfile.ZIP_DEFLATED if self._should_compress(arcname) else zipfile.ZIP_STORED
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+                
+                # 空文件交由writestr写入，compress_size保持为0表示未预压缩
+                if precompress and data:
+                    zinfo.file_size = len(data)
+                    zinfo.CRC = zlib.crc32(data)
+                    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+                        # 原始DEFLATE数据流（不带zlib头），与zipfile的写法一致
+                        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15)
+                        data = compressor.compress(data) + compressor.flush()
+                    zinfo.compress_size = len(data)
+                
+                results.append((zinfo, data, file_path, file_size, None))
+            except Exception as e:
+                results.append((None, None, file_path, file_size, e))
+        return results
+    
+    def _should_compress(self, arcname):
+        """
+        判断文件是否需要压缩
+        
+        Args:
+            arcname: 压缩文件内路径
+            
+        Returns:
+            bool: 压缩级别大于0且不是已压缩的文件格式时返回True
+        """
+        if self.compress_level <= 0:
+            return False
+        return os.path.splitext(arcname)[1].lower() not in self.INCOMPRESSIBLE_EXTENSIONS
+    
+    def _can_write_raw_entry(self, zipf):
+        """
+        判断能否向压缩文件直接写入预压缩数据
+        
+        ZipFile没有写入预压缩数据的公开接口，_write_raw_entry依赖其内部写入流程，
+        只在已核对过的Python版本上且所需内部属性都存在时启用
+        
+        Args:
+            zipf: 已打开的压缩文件
+            
+        Returns:
+            bool: 可以直接写入预压缩数据时返回True
+        """
+        min_version, max_version = self.RAW_ZIP_WRITE_VERSIONS
+        if not min_version <= sys.version_info[:2] <= max_version:
+            return False
+        required = ('_lock', '_writing', '_seekable', '_allowZip64', '_writecheck', '_didModify',
+                    'fp', 'start_dir', 'filelist', 'NameToInfo')
+        if not all(hasattr(zipf, name) for name in required):
+            return False
+        # 不可定位的输出需要在数据后写入数据描述符，不走该流程
+        return bool(zipf._seekable)
+    
+    def _write_raw_entry(self, zipf, zinfo, data):
+        """
+        将已压缩的数据写入压缩文件
+        
+        与ZipFile._open_to_write和_ZipWriteFile.close的写入过程一致，只是跳过了压缩和CRC计算
+        
+        Args:
+            zipf: 已打开的压缩文件
+            zinfo: 已填写大小和CRC的ZipInfo
+            data: 压缩后的数据
+            
+        Raises:
+            ValueError: 压缩文件有其他打开的写入句柄
+            zipfile.LargeZipFile: 需要ZIP64扩展但压缩文件未启用
+        """
+        with zipf._lock:
+            if zipf._writing:
+                raise ValueError("压缩文件有其他打开的写入句柄，无法写入")
+            
+            zinfo.flag_bits = 0
+            if not zinfo.external_attr:
+                zinfo.external_attr = 0o600 << 16  # 权限: ?rw-------
+            
+            zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+            if zip64 and not zipf._allowZip64:
+                raise zipfile.LargeZipFile("文件大小需要ZIP64扩展")
+            
+            zipf.fp.seek(zipf.start_dir)
+            zinfo.header_offset = zipf.fp.tell()
+            zipf._writecheck(zinfo)
+            zipf._didModify = True
+            zipf.fp.write(zinfo.FileHeader(zip64))
+            zipf.fp.write(data)
+            zipf.start_dir = zipf.fp.tell()
+            zipf.filelist.append(zinfo)
+            zipf.NameToInfo[zinfo.filename] = zinfo
+    
     def _extract_zip(self, zip_file, target_dir):
         """
         解压文件
@@ -545,15 +1445,18 @@ class Migrator:
                     self._update(f"压缩文件 {zip_name} 中没有文件", "文件解压")
                     return True
                     
-                self._update(f"开始解压: {zip_name}，共 {total_files} 个文件，总大小 {self._format_size(total_size)}", "文件解压")
+                total_size_str = _format_size(total_size)
+                self._update(f"开始解压: {zip_name}，共 {total_files} 个文件，总大小 {total_size_str}", "文件解压")
                 
                 # 解压文件
                 processed_files = 0
                 processed_size = 0
-                last_progress_time = 0
-                last_file_update_time = 0  # 上次更新文件名的时间
-                update_interval = 300  # 更新间隔降低到300毫秒
-                start_time = time.time()  # 记录开始时间
+                last_progress_ns = 0
+                last_file_update_ns = 0  # 上次更新文件名的时间
+                update_interval_ns = 300_000_000  # 每300毫秒更新一次进度
+                file_update_interval_ns = 500_000_000  # 每500毫秒更新一次当前处理的文件
+                start_ns = time.monotonic_ns()  # 记录开始时间
+                speed_estimator = _SpeedEstimator(start_ns)
                 
                 for file_info in file_list:
                     # 如果任务被取消，则立即返回
@@ -561,47 +1464,37 @@ class Migrator:
                         return False
                     
                     # 显示当前正在处理的文件名和大小
-                    current_time = self._get_current_time_ms()
-                    if current_time - last_file_update_time > 500:  # 每500毫秒更新一次当前处理的文件
+                    now_ns = time.monotonic_ns()
+                    if now_ns - last_file_update_ns > file_update_interval_ns:
                         file_name = file_info.filename
                         file_size = file_info.file_size
-                        formatted_size = self._format_size(file_size)
+                        formatted_size = _format_size(file_size)
                         self._update(f"正在解压: {file_name} ({processed_files+1}/{total_files})，大小: {formatted_size}", "文件解压")
-                        last_file_update_time = current_time
+                        last_file_update_ns = now_ns
                         
                     # 解压单个文件
-                    zipf.extract(file_info, target_dir)
+                    self._extract_member(zipf, file_info, target_dir)
                     
                     # 更新进度
                     processed_files += 1
                     processed_size += file_info.file_size
                     
-                    # 降低更新间隔，提高进度更新频率
-                    current_time = self._get_current_time_ms()
-                    if current_time - last_progress_time > update_interval or processed_files == total_files:
+                    # 每次循环只取一次时间，不需要更新时不做任何格式化
+                    now_ns = time.monotonic_ns()
+                    if now_ns - last_progress_ns > update_interval_ns or processed_files == total_files:
                         progress_percent = int(processed_size / total_size * 100)
                         
                         # 计算预估剩余时间
-                        elapsed_time = time.time() - start_time
-                        if processed_size > 0 and elapsed_time > 0:
-                            speed = processed_size / elapsed_time  # 字节/秒
-                            remaining_size = total_size - processed_size
-                            if speed > 0:
-                                remaining_time = remaining_size / speed
-                                remaining_str = self._format_time(remaining_time)
-                                speed_str = self._format_size(speed) + "/秒"
-                                
-                                self._update(f"{zip_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
-                                           f"已处理 {self._format_size(processed_size)}/{self._format_size(total_size)}，"
-                                           f"速度: {speed_str}，剩余: {remaining_str}", "文件解压进度")
-                            else:
-                                self._update(f"{zip_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
-                                           f"已处理 {self._format_size(processed_size)}/{self._format_size(total_size)}", "文件解压进度")
+                        if speed_estimator.update(now_ns, processed_size) > 0:
+                            self._update(f"{zip_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
+                                       f"已处理 {_format_size(processed_size)}/{total_size_str}，"
+                                       f"速度: {speed_estimator.speed_str}，"
+                                       f"剩余: {speed_estimator.remaining(total_size - processed_size)}", "文件解压进度")
                         else:
                             self._update(f"{zip_name}: {processed_files}/{total_files} 文件 ({progress_percent}%)，"
-                                       f"已处理 {self._format_size(processed_size)}/{self._format_size(total_size)}", "文件解压进度")
+                                       f"已处理 {_format_size(processed_size)}/{total_size_str}", "文件解压进度")
                             
-                        last_progress_time = current_time
+                        last_progress_ns = now_ns
                         
                         # 更新总体进度条
                         if self.progress_callback:
@@ -611,9 +1504,9 @@ class Migrator:
                             self.progress_callback(min(folder_progress + sub_progress, 99))
                 
                 # 计算总耗时
-                total_time = time.time() - start_time
-                time_str = self._format_time(total_time)
-                self._update(f"{zip_name} 解压完成: {processed_files}/{total_files} 文件，大小 {self._format_size(processed_size)}，耗时: {time_str}", "文件解压完成")
+                total_time = (time.monotonic_ns() - start_ns) / 1e9
+                time_str = _format_time(total_time)
+                self._update(f"{zip_name} 解压完成: {processed_files}/{total_files} 文件，大小 {_format_size(processed_size)}，耗时: {time_str}", "文件解压完成")
             
             return True
         except Exception as e:
@@ -621,6 +1514,32 @@ class Migrator:
             self._update(f"解压失败: {os.path.basename(zip_file)}, 错误: {str(e)}", "文件解压错误")
             return False
     
+    def _extract_member(self, zipf, file_info, target_dir):
+        """
+        解压单个文件，使用较大的缓冲区直接复制数据
+        
+        Args:
+            zipf: 已打开的压缩文件
+            file_info: 压缩文件中的文件信息
+            target_dir: 目标目录
+        """
+        # 与ZipFile.extract一致，去掉路径中的空段、'.'和'..'，保证解压到目标目录内
+        parts = [part for part in file_info.filename.split('/') if part not in ('', '.', '..')]
+        target_path = os.path.join(target_dir, *parts)
+        
+        if file_info.is_dir():
+            os.makedirs(target_path, exist_ok=True)
+            return
+        
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        with zipf.open(file_info) as src, open(target_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, self.COPY_BUFFER_SIZE)
+            
+            # 解压后的数据不会再被读取，通知系统不必保留在页面缓存中
+            if hasattr(os, 'posix_fadvise'):
+                dst.flush()
+                os.posix_fadvise(dst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    
     def _save_mapping(self):
         """
         保存映射到文件
@@ -628,14 +1547,26 @@ class Migrator:
         try:
             # 保存为JSON文件
             self._update(f"正在保存路径映射到: {self.mapping_file}", "数据保存")
-            with open(self.mapping_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'migration_time': self._get_current_time(),
-                    'source_path_count': len(self.path_mapping),
-                    'path_mapping': self.path_mapping
-                }, f, ensure_ascii=False, indent=4)
-                
+            mapping_data = {
+                'migration_time': self._get_current_time(),
+                'source_path_count': len(self.path_mapping),
+                'path_mapping': self.path_mapping,
+                'type_mapping': self.type_mapping
+            }
+            if ORJSON_AVAILABLE:
+                # orjson在C中序列化，映射条目较多时明显快于标准库json
+                with open(self.mapping_file, 'wb') as f:
+                    f.write(orjson.dumps(mapping_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(self.mapping_file, 'w', encoding='utf-8') as f:
+                    json.dump(mapping_data, f, ensure_ascii=False, indent=4)
+            
             self._update(f"映射已保存: {len(self.path_mapping)} 个路径映射", "数据保存")
+            
+            # 新的映射生成后，之前创建链接时留下的已完成记录不再有效
+            done_file = self.mapping_file + '.done'
+            if os.path.exists(done_file):
+                os.remove(done_file)
         except Exception as e:
             self.logger.exception(f"保存映射出错: {str(e)}")
             self._update(f"保存映射出错: {str(e)}", "数据保存错误")
@@ -650,79 +1581,25 @@ class Migrator:
         from datetime import datetime
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    def _get_current_time_ms(self):
-        """
-        获取当前时间的毫秒数
-        
-        Returns:
-            int: 当前时间的毫秒数
-        """
-        import time
-        return int(time.time() * 1000)
-    
-    def _format_size(self, size_bytes):
-        """
-        格式化文件大小
-        
-        Args:
-            size_bytes: 文件大小（字节）
-            
-        Returns:
-            str: 格式化后的文件大小
-        """
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.2f} KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes / (1024 * 1024):.2f} MB"
-        else:
-            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
-            
-    def _format_time(self, seconds):
-        """
-        格式化时间
-        
-        Args:
-            seconds: 秒数
-            
-        Returns:
-            str: 格式化后的时间
-        """
-        if seconds < 60:
-            return f"{seconds:.1f}秒"
-        elif seconds < 3600:
-            minutes = seconds / 60
-            return f"{minutes:.1f}分钟"
-        else:
-            hours = seconds / 3600
-            return f"{hours:.1f}小时"
-            
-    def _check_disk_space(self, scan_result):
+    def _check_disk_space(self, large_folders, large_files):
         """
         检查目标磁盘是否有足够的空间
         
         Args:
-            scan_result: 扫描结果
+            large_folders: 需要迁移的大文件夹列表
+            large_files: 需要迁移的大文件列表
             
         Returns:
-            bool: 是否有足够的空间
+            tuple: (是否有足够的空间, 需要迁移的总大小)
         """
+        # 计算需要迁移的文件总大小
+        total_size = (sum(folder_info.get('size', 0) for folder_info in large_folders) +
+                      sum(file_info.get('size', 0) for file_info in large_files))
+        
         try:
             # 导入psutil库检查磁盘空间
             import psutil
             
-            # 计算需要迁移的文件总大小
-            total_size = 0
-            
-            # 计算大文件夹的总大小
-            for folder_info in scan_result.get('large_folders', []):
-                total_size += folder_info.get('size', 0)
-                
-            # 计算大文件的总大小
-            for file_info in scan_result.get('large_files', []):
-                total_size += file_info.get('size', 0)
-                
             # 获取目标磁盘的可用空间
             # 从目标路径中提取盘符
             target_drive = os.path.splitdrive(self.target_path)[0]
@@ -734,28 +1611,27 @@ class Migrator:
             disk_usage = psutil.disk_usage(target_drive)
             free_space = disk_usage.free
             
-            # 考虑压缩率，假设平均压缩率为0.7（即压缩后大小为原大小的70%）
-            # 同时为了安全，额外预留20%的空间
-            required_space = total_size * 0.7 * 1.2
+            # 文件夹直接复制到目标磁盘，按原大小计算，同时为了安全，额外预留20%的空间
+            required_space = total_size * 1.2
             
             # 检查空间是否足够
             if free_space < required_space:
-                self._update(f"目标磁盘空间不足！需要至少 {self._format_size(required_space)}，但只有 {self._format_size(free_space)}。", "空间检查")
+                self._update(f"目标磁盘空间不足！需要至少 {_format_size(required_space)}，但只有 {_format_size(free_space)}。", "空间检查")
                 self._update(f"请清理目标磁盘 {target_drive} 后重试，或者更改配置中的目标路径。", "空间检查")
-                return False
+                return False, total_size
             else:
-                self._update(f"目标磁盘空间充足：需要 {self._format_size(required_space)}，可用 {self._format_size(free_space)}。", "空间检查")
-                return True
+                self._update(f"目标磁盘空间充足：需要 {_format_size(required_space)}，可用 {_format_size(free_space)}。", "空间检查")
+                return True, total_size
                 
         except ImportError:
             self.logger.warning("psutil模块未安装，无法检查磁盘空间")
             self._update("警告：无法检查目标磁盘空间是否足够，请确保目标磁盘有足够空间", "空间检查")
-            return True  # 如果无法检查，则假设空间足够
+            return True, total_size  # 如果无法检查，则假设空间足够
             
         except Exception as e:
             self.logger.exception(f"检查磁盘空间时出错: {str(e)}")
             self._update(f"检查磁盘空间时出错: {str(e)}，请确保目标磁盘有足够空间", "空间检查")
-            return True  # 如果检查出错，则假设空间足够
+            return True, total_size  # 如果检查出错，则假设空间足够
     
     def _update(self, message, operation_type=None):
         """
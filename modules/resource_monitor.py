@@ -11,7 +11,9 @@ import os
 import time
 import logging
 import threading
-import multiprocessing
+from enum import IntEnum
+
+from modules.utils import get_cpu_count
 
 try:
     import psutil
@@ -19,22 +21,62 @@ try:
 except ImportError:
     PSUTIL_AVAILABLE = False
 
+_SIZE_UNITS = (('B', 1), ('KB', 1 << 10), ('MB', 1 << 20), ('GB', 1 << 30))
+
+
+def _format_size(size_bytes):
+    """
+    格式化文件大小
+
+    Args:
+        size_bytes: 文件大小（字节）
+
+    Returns:
+        str: 格式化后的文件大小
+    """
+    # 根据二进制位数直接确定单位，每10位对应一级单位
+    index = max(0, min(3, (int(size_bytes).bit_length() - 1) // 10))
+    if index == 0:
+        return f"{size_bytes} B"
+    unit, divisor = _SIZE_UNITS[index]
+    return f"{size_bytes / divisor:.2f} {unit}"
+
+
+class MemoryPressure(IntEnum):
+    """内存压力等级"""
+    
+    OK = 0  # 正常
+    SLOW = 1  # 接近上限，应放慢启动新任务
+    STOP = 2  # 超过上限，应暂停启动新任务
+
 
 class ResourceMonitor:
     """资源监控器，用于监控和限制程序的资源使用"""
     
-    def __init__(self, cpu_limit=0.5, memory_limit=0.5, check_interval=1.0):
+    CPU_EWMA_ALPHA = 0.2  # CPU使用率指数移动平均中最新采样的权重
+    CPU_HYSTERESIS = 0.05  # 平滑后的CPU使用率与上次调整时相差不足该值时不调整线程数
+    THREAD_ADJUST_TICKS = 3  # 目标线程数连续多少次检查偏向同一方向才调整
+    MEMORY_YELLOW_RATIO = 0.7  # 内存使用达到限制的该比例时开始放慢
+    
+    def __init__(self, cpu_limit=0.5, memory_limit=0.5, check_interval=1.0,
+                 mem_check_interval=0.2, cpu_check_interval=2.0):
         """
         初始化资源监控器
         
         Args:
             cpu_limit: CPU使用限制，范围0-1，表示可使用的CPU核心数比例
             memory_limit: 内存使用限制，范围0-1，表示可使用的系统内存比例
-            check_interval: 检查间隔时间（秒）
+            check_interval: 检查间隔时间（秒），也是出错后重试的基准间隔
+            mem_check_interval: 内存使用情况的检查间隔（秒），内存压力需要尽快响应
+            cpu_check_interval: CPU使用情况的检查间隔（秒），CPU采样开销较大且只用于平滑调整线程数
         """
         self.cpu_limit = max(0.1, min(1.0, cpu_limit))  # 确保在0.1-1.0之间
         self.memory_limit = max(0.1, min(1.0, memory_limit))  # 确保在0.1-1.0之间
+        self.memory_yellow = self.memory_limit * self.MEMORY_YELLOW_RATIO  # 超过该值时放慢启动新任务
+        self.memory_red = self.memory_limit  # 超过该值时暂停启动新任务
         self.check_interval = check_interval
+        self.mem_check_interval = mem_check_interval
+        self.cpu_check_interval = cpu_check_interval
         self.logger = logging.getLogger('MigrateC.ResourceMonitor')
         self.monitor_thread = None
         self.is_running = False
@@ -42,9 +84,16 @@ class ResourceMonitor:
         self.current_memory_usage = 0
         self.system_memory_total = 0
         self.system_memory_available = 0
-        self.cpu_count = multiprocessing.cpu_count()
+        self.cpu_count = get_cpu_count()
         self.max_threads = max(1, int(self.cpu_count * self.cpu_limit))
-        self.lock = threading.Lock()
+        self.lock = threading.Condition()  # 同时用于在内存压力下降时唤醒等待资源的线程
+        self._last_pressure = MemoryPressure.OK  # 上次检查时的内存压力等级
+        self._cpu_ewma = None  # 平滑后的系统CPU使用率
+        self._adjusted_cpu = None  # 上次调整线程数时的平滑CPU使用率
+        self._adjust_direction = 0  # 待调整的方向，1表示增加，-1表示减少
+        self._adjust_ticks = 0  # 连续偏向同一调整方向的检查次数
+        # 当前进程对象只创建一次，cpu_percent依赖同一对象上次调用时的采样
+        self._process = psutil.Process(os.getpid()) if PSUTIL_AVAILABLE else None
         
         # 检查psutil是否可用
         if not PSUTIL_AVAILABLE:
@@ -58,6 +107,10 @@ class ResourceMonitor:
             return
             
         self.is_running = True
+        if PSUTIL_AVAILABLE:
+            # 首次调用cpu_percent(interval=None)只建立采样基准，返回值无意义
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
         self.monitor_thread = threading.Thread(target=self._monitor_resources, daemon=True)
         self.monitor_thread.start()
         self.logger.info(f"资源监控已启动，CPU限制: {self.cpu_limit*100:.0f}%，内存限制: {self.memory_limit*100:.0f}%")
@@ -67,6 +120,9 @@ class ResourceMonitor:
         停止资源监控
         """
         self.is_running = False
+        # 唤醒仍在等待资源的线程，让其退出等待
+        with self.lock:
+            self.lock.notify_all()
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=2.0)
         self.logger.info("资源监控已停止")
@@ -75,17 +131,46 @@ class ResourceMonitor:
         """
         监控资源使用情况
         """
+        last_cpu_check = 0.0
         while self.is_running:
             try:
-                self._update_resource_usage()
-                time.sleep(self.check_interval)
+                # 内存每次都检查，CPU按较长的间隔检查
+                self._update_memory_usage()
+                now = time.monotonic()
+                if now - last_cpu_check >= self.cpu_check_interval:
+                    last_cpu_check = now
+                    self._update_cpu_usage()
+                time.sleep(self.mem_check_interval)
             except Exception as e:
                 self.logger.error(f"监控资源时出错: {str(e)}")
                 time.sleep(self.check_interval * 2)  # 出错时增加等待时间
     
-    def _update_resource_usage(self):
+    def _update_memory_usage(self):
+        """
+        更新内存使用情况
+        """
+        if not PSUTIL_AVAILABLE:
+            return
+        
+        try:
+            # 获取内存使用情况
+            memory = psutil.virtual_memory()
+            self.system_memory_total = memory.total
+            self.system_memory_available = memory.available
+            self.current_memory_usage = (memory.total - memory.available) / memory.total
+            
+            # 内存压力下降时立即唤醒等待资源的线程
+            pressure = self.should_throttle()
+            if pressure < self._last_pressure:
+                with self.lock:
+                    self.lock.notify_all()
+            self._last_pressure = pressure
+        except Exception as e:
+            self.logger.error(f"使用psutil获取内存使用情况时出错: {str(e)}")
+    
+    def _update_cpu_usage(self):
         """
-        更新资源使用情况
+        更新CPU使用情况并调整最大线程数
         """
         if PSUTIL_AVAILABLE:
             # 使用psutil获取更准确的资源使用情况
@@ -93,49 +178,81 @@ class ResourceMonitor:
                 # 获取CPU使用率
                 self.current_cpu_usage = psutil.cpu_percent(interval=None) / 100.0
                 
-                # 获取内存使用情况
-                memory = psutil.virtual_memory()
-                self.system_memory_total = memory.total
-                self.system_memory_available = memory.available
-                self.current_memory_usage = (memory.total - memory.available) / memory.total
-                
                 # 获取当前进程的资源使用情况
-                process = psutil.Process(os.getpid())
-                process_cpu = process.cpu_percent(interval=None) / 100.0
-                process_memory = process.memory_info().rss
+                process_cpu = self._process.cpu_percent(interval=None) / 100.0
+                process_memory = self._process.memory_info().rss
                 
                 # 更新最大线程数
-                with self.lock:
-                    # 根据当前CPU使用情况动态调整最大线程数
-                    available_cpu = max(0.1, self.cpu_limit - (self.current_cpu_usage - process_cpu))
-                    self.max_threads = max(1, int(self.cpu_count * available_cpu))
+                self._adjust_max_threads(process_cpu)
                 
                 # 记录资源使用情况（仅在使用率较高时记录，避免日志过多）
                 if self.current_cpu_usage > 0.7 or self.current_memory_usage > 0.7:
                     self.logger.info(f"系统资源使用情况 - CPU: {self.current_cpu_usage*100:.1f}%，"  
                                     f"内存: {self.current_memory_usage*100:.1f}%，"  
                                     f"进程CPU: {process_cpu*100:.1f}%，"  
-                                    f"进程内存: {self._format_size(process_memory)}，"  
+                                    f"进程内存: {_format_size(process_memory)}，"  
                                     f"最大线程数: {self.max_threads}")
             except Exception as e:
-                self.logger.error(f"使用psutil获取资源使用情况时出错: {str(e)}")
+                self.logger.error(f"使用psutil获取CPU使用情况时出错: {str(e)}")
         else:
             # 如果psutil不可用，使用简单的方法估计资源使用情况
             # 这种方法不太准确，但可以提供基本的资源限制
             self.max_threads = max(1, int(self.cpu_count * self.cpu_limit))
     
+    def _adjust_max_threads(self, process_cpu):
+        """
+        根据平滑后的CPU使用率调整最大线程数，负载持续变化时才调整，避免线程数随瞬时波动反复变化
+        
+        Args:
+            process_cpu: 当前进程的CPU使用率（按单核计，可能大于1）
+        """
+        # 对系统CPU使用率做指数移动平均
+        if self._cpu_ewma is None:
+            self._cpu_ewma = self.current_cpu_usage
+        else:
+            self._cpu_ewma = self.CPU_EWMA_ALPHA * self.current_cpu_usage + (1 - self.CPU_EWMA_ALPHA) * self._cpu_ewma
+        
+        # 扣除本进程占用后，计算在CPU限制内还可使用的比例
+        other_cpu = max(0.0, self._cpu_ewma - process_cpu / self.cpu_count)
+        available_cpu = max(0.1, self.cpu_limit - other_cpu)
+        target_threads = max(1, int(self.cpu_count * available_cpu))
+        
+        with self.lock:
+            if target_threads == self.max_threads or (
+                    self._adjusted_cpu is not None and abs(self._cpu_ewma - self._adjusted_cpu) < self.CPU_HYSTERESIS):
+                self._adjust_ticks = 0
+                return
+            
+            direction = 1 if target_threads > self.max_threads else -1
+            if direction == self._adjust_direction:
+                self._adjust_ticks += 1
+            else:
+                self._adjust_direction = direction
+                self._adjust_ticks = 1
+            
+            # 连续多次偏向同一方向才调整
+            if self._adjust_ticks >= self.THREAD_ADJUST_TICKS:
+                self.logger.debug(f"调整最大线程数: {self.max_threads} -> {target_threads}，平滑CPU使用率: {self._cpu_ewma*100:.1f}%")
+                self.max_threads = target_threads
+                self._adjusted_cpu = self._cpu_ewma
+                self._adjust_ticks = 0
+    
     def should_throttle(self):
         """
         检查是否应该限制资源使用
         
         Returns:
-            bool: 是否应该限制资源使用
+            MemoryPressure: 内存压力等级，OK表示无需限制
         """
         if not PSUTIL_AVAILABLE:
-            return False
-            
-        # 如果内存使用超过限制，则应该限制
-        return self.current_memory_usage > self.memory_limit
+            return MemoryPressure.OK
+        
+        memory_usage = self.current_memory_usage
+        if memory_usage > self.memory_red:
+            return MemoryPressure.STOP
+        if memory_usage > self.memory_yellow:
+            return MemoryPressure.SLOW
+        return MemoryPressure.OK
     
     def get_max_threads(self):
         """
@@ -147,12 +264,13 @@ class ResourceMonitor:
         with self.lock:
             return self.max_threads
     
-    def wait_for_resources(self, timeout=None):
+    def wait_for_resources(self, timeout=None, level=MemoryPressure.SLOW):
         """
         等待资源可用
         
         Args:
             timeout: 超时时间（秒），None表示无限等待
+            level: 可以继续时允许的最高内存压力等级，默认只要求内存使用低于上限
             
         Returns:
             bool: 是否在超时前资源变为可用
@@ -160,39 +278,22 @@ class ResourceMonitor:
         if not PSUTIL_AVAILABLE:
             return True
             
-        start_time = time.time()
-        while self.is_running:
-            # 如果资源使用低于限制，则可以继续
-            if self.current_memory_usage < self.memory_limit:
-                return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while self.is_running:
+                # 如果内存压力不高于要求的等级，则可以继续
+                if self.should_throttle() <= level:
+                    return True
                 
-            # 检查是否超时
-            if timeout is not None and time.time() - start_time > timeout:
-                return False
+                # 检查是否超时
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
                 
-            # 等待一段时间再检查
-            time.sleep(self.check_interval)
+                # 等待监控线程在内存压力下降时唤醒
+                self.lock.wait(timeout=remaining)
         
         return False
-    
-    def _format_size(self, size_bytes):
-        """
-        格式化文件大小
-        
-        Args:
-            size_bytes: 文件大小（字节）
-            
-        Returns:
-            str: 格式化后的文件大小
-        """
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.2f} KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes / (1024 * 1024):.2f} MB"
-        else:
-            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
 
 
 def get_optimal_thread_count(cpu_limit=0.5):
@@ -206,7 +307,7 @@ def get_optimal_thread_count(cpu_limit=0.5):
         int: 线程数
     """
     # 获取CPU核心数
-    cpu_count = multiprocessing.cpu_count()
+    cpu_count = get_cpu_count()
     
     # 根据CPU限制计算可用的CPU核心数
     available_cores = max(1, int(cpu_count * cpu_limit))
@@ -11,14 +11,45 @@ import os
 import json
 import logging
 import threading
+import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
 from queue import Queue
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+
+def _format_size(size):
+    """
+    格式化文件大小
+
+    Args:
+        size: 文件大小（字节）
+
+    Returns:
+        str: 格式化后的文件大小
+    """
+    # 根据二进制位数直接确定单位，每10位对应一级单位
+    index = max(0, min(5, (int(size).bit_length() - 1) // 10))
+    return f"{size / (1 << (index * 10)):.2f} {_SIZE_UNITS[index]}"
+
 
 class Scanner:
     """文件夹和文件扫描器"""
     
+    FOUND_REPORT_INTERVAL = 100  # 找到的大文件/大文件夹每隔多少个上报一次消息
+    PROGRESS_PUBLISH_INTERVAL = 32  # 每个扫描线程每扫描多少个目录发布一次进度计数
+    PROGRESS_CALLBACK_INTERVAL = 0.1  # 进度回调的最小间隔（秒）
+    COMPACT_RESULT_COUNT = 10000  # 结果总数超过该值时不缩进，以紧凑格式保存
+    SAVE_BUFFER_SIZE = 1024 * 1024  # 保存结果时的写缓冲区大小
+    RESULT_FLUSH_COUNT = 256  # 每个扫描任务累计多少个结果写出一次到临时结果文件
+    
     def __init__(self, scan_paths, size_threshold, output_file, max_threads=4,
                  update_callback=None, progress_callback=None, exclude_folders=None):
         """
@@ -35,19 +66,29 @@ class Scanner:
             exclude_folders: 全局需要排除的文件夹名称列表，这些文件夹将在所有路径下被跳过不进行迁移
         """
         self.scan_paths = scan_paths
+        # 扫描路径配置只解包一次，元素为 (路径, 最大扫描深度, 特定排除文件夹)
+        self._scan_roots = tuple((path_info['path'], path_info.get('max_depth', None), path_info.get('exclude_folders', []))
+                                 for path_info in scan_paths)
         self.size_threshold = size_threshold
         self.output_file = output_file
         self.max_threads = max_threads
         self.update_callback = update_callback
         self.progress_callback = progress_callback
         self.global_exclude_folders = exclude_folders or []  # 全局需要排除的文件夹名称列表
+        self._global_exclude_set = frozenset(self.global_exclude_folders)  # 全局排除文件夹集合，多次扫描复用
         self.logger = logging.getLogger('MigrateC.Scanner')
         self.large_folders = []  # 存储大文件夹信息
         self.large_files = []  # 存储大文件信息
         self.lock = threading.Lock()  # 线程锁
-        self.total_folders = 0  # 总文件夹数
+        self.total_folders = 0  # 已发现的文件夹数，扫描过程中逐步增加
         self.processed_folders = 0  # 已处理文件夹数
+        self.reported_progress = 0  # 已上报的进度，保证进度不回退
+        self._last_progress_ts = 0.0  # 上次调用进度回调的时间
         self.is_running = True  # 运行标志
+        self.size_slots = None  # 线程池中同时在途的文件夹大小计算任务名额
+        self._folder_sizes = {}  # 单独计算大小的文件夹路径 -> 大小
+        self._result_file = output_file + '.ndjson'  # 扫描过程中逐条写出结果的临时文件，每行一个JSON
+        self._result_stream = None  # 临时结果文件的写入流
     
     def scan(self):
         """
@@ -60,8 +101,17 @@ class Scanner:
             # 确保输出目录存在
             os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
             
-            # 首先计算总文件夹数
-            self._count_total_folders()
+            # 总文件夹数在扫描过程中随发现的子目录逐步累加，不再预先遍历一遍
+            self.total_folders = 0
+            self.processed_folders = 0
+            self.reported_progress = 0
+            self._last_progress_ts = 0.0
+            self._folder_sizes = {}
+            self.large_folders = []
+            self.large_files = []
+            
+            # 找到的结果随扫描逐条写入临时文件，不在内存中累积
+            self._result_stream = open(self._result_file, 'w', encoding='utf-8', buffering=self.SAVE_BUFFER_SIZE)
             
             # 更新进度
             if self.progress_callback:
@@ -69,21 +119,30 @@ class Scanner:
             
             # 使用线程池扫描文件夹
             with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-                for path_info in self.scan_paths:
+                # 文件夹大小计算也提交到同一个线程池，限制在途任务数避免任务无限堆积
+                self.size_slots = threading.BoundedSemaphore(self.max_threads * 2)
+                scan_futures = []
+                for path, max_depth, path_exclude_folders in self._scan_roots:
                     if not self.is_running:
                         break
                     
-                    # 获取路径、最大深度和特定排除文件夹
-                    path = path_info['path']
-                    max_depth = path_info.get('max_depth', None)
-                    path_exclude_folders = path_info.get('exclude_folders', [])
-                    
                     if not os.path.exists(path):
                         self._update(f"路径不存在: {path}")
                         continue
                     
                     # self._update(f"开始扫描: {path}，最大深度: {max_depth if max_depth is not None else '不限'}，特定排除文件夹: {path_exclude_folders}，全局排除文件夹: {self.global_exclude_folders}")
-                    executor.submit(self._scan_directory, path, max_depth, path_exclude_folders)
+                    scan_futures.append(executor.submit(self._scan_directory, path, max_depth, path_exclude_folders, executor))
+                
+                # 扫描任务全部结束后不会再提交新的大小计算任务，退出with时等待剩余任务完成
+                wait(scan_futures)
+            
+            # 大文件已在扫描中写出，这里自下而上汇总出各文件夹的大小
+            for future in scan_futures:
+                scan_result = future.result()
+                if scan_result is None:
+                    continue
+                walked_dirs, max_depth = scan_result
+                self._collect_large_folders(walked_dirs, max_depth)
             
             # 保存结果
             if self.is_running:
@@ -100,39 +159,10 @@ class Scanner:
             self.logger.exception(f"扫描出错: {str(e)}")
             self._update(f"扫描出错: {str(e)}")
             return False
+        finally:
+            self._remove_result_stream()
     
-    def _count_total_folders(self):
-        """
-        计算总文件夹数
-        """
-        self._update("正在计算总文件夹数...")
-        self.total_folders = 0
-        
-        for path_info in self.scan_paths:
-            path = path_info['path']
-            max_depth = path_info.get('max_depth', None)
-            
-            if not os.path.exists(path):
-                continue
-            
-            # 考虑层级限制计算文件夹数
-            for root, dirs, _ in os.walk(path, topdown=True):
-                # 如果设置了最大深度，计算当前深度
-                if max_depth is not None:
-                    rel_path = os.path.relpath(root, path)
-                    current_depth = 0 if rel_path == '.' else rel_path.count(os.sep) + 1
-                    
-                    # 如果已经达到最大深度，则不再递归
-                    if current_depth >= max_depth:
-                        self.total_folders += len(dirs)  # 添加当前层的文件夹数
-                        dirs.clear()  # 清空dirs列表，阻止os.walk继续递归
-                        continue
-                
-                self.total_folders += len(dirs)
-        
-        self._update(f"总文件夹数: {self.total_folders}")
-    
-    def _scan_directory(self, directory, max_depth=None, path_exclude_folders=None):
+    def _scan_directory(self, directory, max_depth=None, path_exclude_folders=None, executor=None):
         """
         扫描目录
         
@@ -140,164 +170,311 @@ class Scanner:
             directory: 要扫描的目录
             max_depth: 最大扫描深度，None表示不限制
             path_exclude_folders: 该路径特定的排除文件夹列表
+            executor: 用于并行计算文件夹大小的线程池，None表示在当前线程计算
+            
+        Returns:
+            tuple: (遍历过的目录列表, 最大扫描深度)，出错或取消时返回None
+                   找到的大文件直接写入临时结果文件
+                   目录列表中每项为 (目录路径, 深度, 目录下文件总大小, 子目录列表, 排除的子目录列表)
         """
         try:
-            # 合并全局排除和路径特定排除文件夹列表
-            exclude_folders = list(self.global_exclude_folders)
-            if path_exclude_folders:
-                exclude_folders.extend(path_exclude_folders)
+            # 合并全局排除和路径特定排除文件夹，使用集合判断是否排除
+            exclude_set = self._global_exclude_set.union(path_exclude_folders or ())
             
             # 记录详细的扫描配置信息
             self._update(f"扫描目录: {directory}，最大深度: {max_depth if max_depth is not None else '不限'}，"  
                        f"应用的排除规则 - 全局: {self.global_exclude_folders}，路径特定: {path_exclude_folders or []}，"  
-                       f"合并后的排除列表: {exclude_folders}")
+                       f"合并后的排除列表: {sorted(exclude_set)}")
             
-            # 使用os.walk的topdown参数，以便我们可以控制递归深度
-            for root, dirs, files in os.walk(directory, topdown=True, followlinks=False):
+            # 结果先记录在本地，累计一批后写出，目录计数在本地累计后批量发布
+            walked_dirs = []
+            found_files = []
+            found_count = 0
+            discovered = 1  # 尚未发布的已发现目录数，包含起始目录
+            scanned = 0  # 尚未发布的已扫描目录数
+            
+            # 使用显式栈和os.scandir遍历，文件类型和大小直接取自DirEntry，不再对每个文件单独stat
+            # 栈中同时记录目录相对于起始目录的深度，不需要再用relpath计算
+            stack = [(directory, 0)]
+            while stack:
                 if not self.is_running:
                     return
                 
-                # 计算当前深度
-                current_depth = 0
-                if max_depth is not None:
-                    # 计算相对于起始目录的深度
-                    rel_path = os.path.relpath(root, directory)
-                    current_depth = 0 if rel_path == '.' else rel_path.count(os.sep) + 1
-                    
-                    # 如果已经达到最大深度，则不再递归
-                    if current_depth >= max_depth:
-                        dirs.clear()  # 清空dirs列表，阻止os.walk继续递归
-                        continue  # 跳过当前层级，不处理这一层的目录
+                if scanned >= self.PROGRESS_PUBLISH_INTERVAL:
+                    self._publish_progress(discovered, scanned)
+                    discovered = scanned = 0
                 
-                # 过滤掉需要排除的文件夹
-                dirs_to_process = [d for d in dirs if d not in exclude_folders]
+                root, current_depth = stack.pop()
+                scanned += 1
                 
-                # 扫描当前目录下的文件
-                for file_name in files:
+                try:
+                    with os.scandir(root) as it:
+                        entries = list(it)
+                except OSError as e:
+                    self.logger.debug(f"读取目录出错: {root}, {str(e)}")
+                    continue
+                
+                # 区分子目录和文件，排除的文件夹不作为结果也不再向下遍历，但仍计入上级文件夹的大小
+                dirs_to_process = []
+                excluded_dirs = []
+                files_size = 0
+                for entry in entries:
                     if not self.is_running:
                         return
                     
-                    file_path = os.path.join(root, file_name)
-                    
                     try:
                         # 检查是否为软连接，如果是则跳过
-                        if os.path.islink(file_path):
-                            self.logger.debug(f"跳过软连接文件: {file_path}")
+                        if entry.is_symlink():
+                            self.logger.debug(f"跳过软连接: {entry.path}")
+                            continue
+                        
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name in exclude_set:
+                                excluded_dirs.append(entry.path)
+                            else:
+                                dirs_to_process.append(entry.path)
                             continue
                         
                         # 获取文件大小
-                        file_size = os.path.getsize(file_path)
+                        file_size = entry.stat(follow_symlinks=False).st_size
+                        files_size += file_size
                         
                         # 如果文件大小超过阈值，则添加到结果列表
                         if file_size >= self.size_threshold:
-                            # 计算文件相对于起始目录的深度
-                            file_rel_path = os.path.relpath(file_path, directory)
-                            file_depth = 0 if file_rel_path == '.' else file_rel_path.count(os.sep)
+                            file_path = entry.path
+                            found_files.append({
+                                'path': file_path,
+                                'size': file_size,
+                                'depth': current_depth,  # 添加深度信息，方便后续过滤
+                                'type': 'file'  # 标记为文件
+                            })
+                            
+                            found_count += 1
                             
-                            with self.lock:
-                                self.large_files.append({
-                                    'path': file_path,
-                                    'size': file_size,
-                                    'size_human': self._format_size(file_size),
-                                    'depth': file_depth,  # 添加深度信息，方便后续过滤
-                                    'type': 'file'  # 标记为文件
-                                })
-                                self._update(f"找到大文件: {file_path} ({self._format_size(file_size)})")
-                    except Exception as e:
-                        self.logger.warning(f"获取文件大小出错: {file_path}, {str(e)}")
+                            # 按间隔上报，结果很多时避免每项都格式化并写日志
+                            if (found_count - 1) % self.FOUND_REPORT_INTERVAL == 0:
+                                self._update(f"找到大文件: {file_path} ({_format_size(file_size)})")
+                            
+                            if len(found_files) >= self.RESULT_FLUSH_COUNT:
+                                self._write_results(found_files)
+                                found_files = []
+                    except OSError as e:
+                        self.logger.warning(f"获取文件大小出错: {entry.path}, {str(e)}")
                 
-                for dir_name in dirs_to_process:
-                    if not self.is_running:
-                        return
-                    
-                    dir_path = os.path.join(root, dir_name)
-                    
-                    # 检查是否为软连接目录，如果是则跳过
-                    if os.path.islink(dir_path):
-                        self.logger.debug(f"跳过软连接目录: {dir_path}")
-                        continue
-                    
-                    # 如果文件夹名称在排除列表中，跳过该文件夹
-                    if dir_name in exclude_folders:
-                        self._update(f"跳过排除的文件夹: {dir_path}，排除原因: 文件夹名称在排除列表中 {exclude_folders}")
-                        continue
-                    
-                    # 更新已处理文件夹数
-                    with self.lock:
-                        self.processed_folders += 1
-                        progress = int(self.processed_folders / max(1, self.total_folders) * 100)
-                        if self.progress_callback and progress <= 100:
-                            self.progress_callback(progress)
-                    
-                    # 计算当前目录的深度
-                    dir_rel_path = os.path.relpath(dir_path, directory)
-                    dir_depth = 0 if dir_rel_path == '.' else dir_rel_path.count(os.sep) + 1
-                    
-                    # 只有当深度符合要求时才处理该目录
-                    # 如果max_depth为2，则只处理深度为0（根目录）和深度为2的目录
-                    # 跳过深度为1的目录（中间层级）
-                    if max_depth is not None and dir_depth == 1 and max_depth == 2:
-                        self.logger.debug(f"跳过中间层级目录: {dir_path} (深度: {dir_depth}, 最大深度: {max_depth})")
-                        continue
-                    
-                    # 计算文件夹大小
-                    try:
-                        size = self._get_folder_size(dir_path)
-                        
-                        # 如果文件夹大小超过阈值，则添加到结果列表
-                        if size >= self.size_threshold:
-                            with self.lock:
-                                self.large_folders.append({
-                                    'path': dir_path,
-                                    'size': size,
-                                    'size_human': self._format_size(size),
-                                    'depth': dir_depth,  # 添加深度信息，方便后续过滤
-                                    'type': 'folder'  # 标记为文件夹
-                                })
-                                self._update(f"找到大文件夹: {dir_path} ({self._format_size(size)})")
-                    except Exception as e:
-                        self.logger.warning(f"计算文件夹大小出错: {dir_path}, {str(e)}")
+                walked_dirs.append((root, current_depth, files_size, dirs_to_process, excluded_dirs))
+                
+                # 子目录未达到最大深度时继续向下遍历，并计入总数，进度按 已扫描/(已扫描+待扫描) 估算
+                dir_depth = current_depth + 1
+                if max_depth is None or dir_depth < max_depth:
+                    stack.extend((dir_path, dir_depth) for dir_path in dirs_to_process)
+                    discovered += len(dirs_to_process)
+                else:
+                    # 达到最大深度的子目录不再遍历，单独计算大小
+                    for dir_path in dirs_to_process:
+                        self._submit_folder_size(dir_path, executor)
+                
+                # 当前目录的大小需要汇总时，排除的子目录也要单独计算大小
+                if self._is_folder_reported(current_depth, max_depth):
+                    for dir_path in excluded_dirs:
+                        self._submit_folder_size(dir_path, executor)
+
+            self._publish_progress(discovered, scanned)
+            self._write_results(found_files)
+            return walked_dirs, max_depth
         except Exception as e:
             self.logger.warning(f"扫描目录出错: {directory}, {str(e)}")
+            return None
     
-    def _get_folder_size(self, folder_path):
+    def _publish_progress(self, discovered, scanned):
         """
-        获取文件夹大小
+        将本地累计的目录计数发布到共享计数并更新进度
         
         Args:
-            folder_path: 文件夹路径
+            discovered: 新发现的目录数
+            scanned: 新扫描完成的目录数
+        """
+        report = False
+        with self.lock:
+            self.total_folders += discovered
+            self.processed_folders += scanned
+            progress = int(self.processed_folders / max(1, self.total_folders) * 100)
+            # 新发现的子目录会使估算进度下降，只上报更大的进度，且限制回调频率
+            now = time.monotonic()
+            if (self.progress_callback and self.reported_progress < progress <= 100 and
+                    now - self._last_progress_ts > self.PROGRESS_CALLBACK_INTERVAL):
+                self.reported_progress = progress
+                self._last_progress_ts = now
+                report = True
+        
+        # 在锁外调用回调，界面更新不阻塞其他扫描线程
+        if report:
+            self.progress_callback(progress)
+    
+    def _is_folder_reported(self, depth, max_depth):
+        """
+        判断该深度的文件夹是否作为候选结果
+        
+        Args:
+            depth: 文件夹相对于扫描起始目录的深度
+            max_depth: 最大扫描深度
+        
+        Returns:
+            bool: 是否作为候选结果
+        """
+        # 起始目录本身不作为结果
+        # 如果max_depth为2，则跳过深度为1的目录（中间层级），只处理深度为2的目录
+        return depth >= 1 and not (depth == 1 and max_depth == 2)
+    
+    def _submit_folder_size(self, dir_path, executor):
+        """
+        计算文件夹大小，线程池有空闲名额时并行计算，否则直接在当前线程计算
+        
+        Args:
+            dir_path: 文件夹路径
+            executor: 线程池，None表示在当前线程计算
+        """
+        if executor is not None and self.size_slots.acquire(blocking=False):
+            future = executor.submit(self._store_folder_size, dir_path)
+            future.add_done_callback(lambda _: self.size_slots.release())
+        else:
+            self._store_folder_size(dir_path)
+    
+    def _store_folder_size(self, dir_path):
+        """
+        计算文件夹大小并记录，供扫描结束后汇总
+        
+        Args:
+            dir_path: 文件夹路径
+        """
+        if not self.is_running:
+            return
+        
+        try:
+            self._folder_sizes[dir_path] = self._get_folder_size(dir_path)
+        except Exception as e:
+            self.logger.warning(f"计算文件夹大小出错: {dir_path}, {str(e)}")
+    
+    def _collect_large_folders(self, walked_dirs, max_depth):
+        """
+        由遍历过的目录自下而上汇总文件夹大小，并收集超过阈值的文件夹
+        
+        Args:
+            walked_dirs: _scan_directory 遍历过的目录列表，父目录总在子目录之前
+            max_depth: 最大扫描深度
+        """
+        folder_sizes = self._folder_sizes
+        
+        # 倒序处理时子目录的大小总是先于父目录算出
+        for dir_path, depth, files_size, child_dirs, excluded_dirs in reversed(walked_dirs):
+            folder_sizes[dir_path] = (files_size +
+                                      sum(folder_sizes.get(child, 0) for child in child_dirs) +
+                                      sum(folder_sizes.get(child, 0) for child in excluded_dirs))
+        
+        found_folders = []
+        found_count = 0
+        for dir_path, depth, files_size, child_dirs, excluded_dirs in walked_dirs:
+            dir_depth = depth + 1
+            if not self._is_folder_reported(dir_depth, max_depth):
+                continue
             
+            for child in child_dirs:
+                size = folder_sizes.get(child)
+                
+                # 如果文件夹大小超过阈值，则添加到结果列表
+                if size is not None and size >= self.size_threshold:
+                    found_folders.append({
+                        'path': child,
+                        'size': size,
+                        'depth': dir_depth,  # 添加深度信息，方便后续过滤
+                        'type': 'folder'  # 标记为文件夹
+                    })
+                    found_count += 1
+                    
+                    # 按间隔上报，结果很多时避免每项都格式化并写日志
+                    if (found_count - 1) % self.FOUND_REPORT_INTERVAL == 0:
+                        self._update(f"找到大文件夹: {child} ({_format_size(size)})")
+                    
+                    if len(found_folders) >= self.RESULT_FLUSH_COUNT:
+                        self._write_results(found_folders)
+                        found_folders = []
+        
+        self._write_results(found_folders)
+    
+    def _write_results(self, items):
+        """
+        将一批结果写入临时结果文件，每个结果一行
+        
+        Args:
+            items: 结果列表
+        """
+        if not items:
+            return
+        
+        # 在锁外完成序列化，只在写入时短暂持锁
+        lines = ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in items)
+        with self.lock:
+            self._result_stream.write(lines)
+    
+    def _read_results(self):
+        """
+        读取临时结果文件中的全部结果
+        
         Returns:
-            int: 文件夹大小（字节）
+            tuple: (大文件夹列表, 大文件列表)
         """
-        total_size = 0
-        for root, dirs, files in os.walk(folder_path, followlinks=False):
-            for file in files:
-                try:
-                    file_path = os.path.join(root, file)
-                    # 跳过软连接文件
-                    if os.path.islink(file_path):
-                        continue
-                    total_size += os.path.getsize(file_path)
-                except Exception as e:
-                    self.logger.debug(f"获取文件大小出错: {file_path}, {str(e)}")
-        return total_size
+        large_folders = []
+        large_files = []
+        with open(self._result_file, 'r', encoding='utf-8', buffering=self.SAVE_BUFFER_SIZE) as f:
+            for line in f:
+                item = json.loads(line)
+                if item['type'] == 'folder':
+                    large_folders.append(item)
+                else:
+                    large_files.append(item)
+        return large_folders, large_files
     
-    def _format_size(self, size):
+    def _remove_result_stream(self):
         """
-        格式化文件大小
+        关闭并删除临时结果文件
+        """
+        if self._result_stream is not None:
+            self._result_stream.close()
+            self._result_stream = None
+        try:
+            os.remove(self._result_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"删除临时结果文件出错: {self._result_file}, {str(e)}")
+    
+    def _get_folder_size(self, folder_path):
+        """
+        获取文件夹大小
         
         Args:
-            size: 文件大小（字节）
+            folder_path: 文件夹路径
             
         Returns:
-            str: 格式化后的文件大小
+            int: 文件夹大小（字节）
         """
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                return f"{size:.2f} {unit}"
-            size /= 1024.0
-        return f"{size:.2f} PB"
+        total_size = 0
+        stack = [folder_path]
+        while stack:
+            current_path = stack.pop()
+            try:
+                with os.scandir(current_path) as it:
+                    for entry in it:
+                        try:
+                            # 跳过软连接，目录入栈继续遍历，文件大小直接取自DirEntry
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                total_size += entry.stat(follow_symlinks=False).st_size
+                        except OSError as e:
+                            self.logger.debug(f"获取文件大小出错: {entry.path}, {str(e)}")
+            except OSError as e:
+                self.logger.debug(f"读取目录出错: {current_path}, {str(e)}")
+        return total_size
     
     def _save_results(self):
         """
@@ -307,11 +484,20 @@ class Scanner:
         - 如果配置了扫描2层目录，那么第1层的结果会被过滤掉
         """
         try:
+            # 写完临时结果文件后一次读回
+            self._result_stream.close()
+            self._result_stream = None
+            self.large_folders, self.large_files = self._read_results()
+            
             # 过滤掉中间层级的目录
-            filtered_folders = self._filter_intermediate_folders()
+            filtered_folders = self._filter_intermediate(self.large_folders, 1)
             
             # 过滤掉中间层级的文件
-            filtered_files = self._filter_intermediate_files()
+            filtered_files = self._filter_intermediate(self.large_files, 0)
+            
+            # 可读的大小只在保存时统一格式化
+            filtered_folders = [dict(folder, size_human=_format_size(folder['size'])) for folder in filtered_folders]
+            filtered_files = [dict(file, size_human=_format_size(file['size'])) for file in filtered_files]
             
             # 合并文件夹和文件结果
             all_results = {
@@ -320,10 +506,21 @@ class Scanner:
                 'scan_time': self._get_current_time()
             }
             
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                json.dump(all_results, f, ensure_ascii=False, indent=4)
-            
+            # 结果很多时缩进会使文件体积和序列化时间成倍增加，改为紧凑格式
             total_items = len(filtered_folders) + len(filtered_files)
+            compact = total_items > self.COMPACT_RESULT_COUNT
+            
+            if ORJSON_AVAILABLE:
+                # orjson在C中序列化，结果条目较多时明显快于标准库json
+                with open(self.output_file, 'wb') as f:
+                    f.write(orjson.dumps(all_results, option=None if compact else orjson.OPT_INDENT_2))
+            else:
+                with open(self.output_file, 'w', encoding='utf-8', buffering=self.SAVE_BUFFER_SIZE) as f:
+                    if compact:
+                        json.dump(all_results, f, ensure_ascii=False, separators=(',', ':'))
+                    else:
+                        json.dump(all_results, f, ensure_ascii=False, indent=4)
+            
             self.logger.info(f"扫描结果已保存到: {self.output_file}，大文件夹数量: {len(filtered_folders)}，大文件数量: {len(filtered_files)}，总数量: {total_items}")
             self._update(f"扫描完成，共找到 {len(filtered_folders)} 个大文件夹和 {len(filtered_files)} 个大文件")
         except Exception as e:
@@ -341,171 +538,102 @@ class Scanner:
             self.update_callback(message)
         self.logger.info(message)
     
-    def _filter_intermediate_files(self):
+    def _filter_intermediate(self, items, depth_bias):
         """
-        过滤中间层级的文件
+        过滤中间层级的文件或目录
         
         根据用户需求：
         1. 如果配置了扫描3层目录，那么第2层的结果应该被过滤掉
         2. 如果配置了扫描2层目录，那么第1层的结果应该被过滤掉
         
+        Args:
+            items: 大文件列表或大文件夹列表
+            depth_bias: 直接位于扫描路径下的项目深度，文件为0，文件夹为1
+            
         Returns:
-            list: 过滤后的大文件列表
+            list: 过滤后的列表
         """
         # 如果没有配置扫描路径或者最大深度，则不过滤
-        if not self.scan_paths:
-            return self.large_files
+        if not self._scan_roots:
+            return items
         
-        # 创建一个字典，按扫描路径分组存储文件
-        path_groups = {}
-        for path_info in self.scan_paths:
-            base_path = path_info['path']
-            max_depth = path_info.get('max_depth', None)
-            if max_depth and max_depth > 1:  # 只有当最大深度大于1时才需要过滤
-                path_groups[base_path] = {
-                    'max_depth': max_depth,
-                    'files': []
-                }
+        # 只有当最大深度大于1时才需要过滤
+        path_groups = self._build_filter_groups()
         
         # 如果没有需要过滤的路径，则直接返回原始结果
         if not path_groups:
-            return self.large_files
+            return items
         
-        # 将文件按扫描路径分组
-        filtered_files = []
-        for file in self.large_files:
-            file_path = file['path']
-            added = False
+        filtered_items = []
+        for item in items:
+            group = self._find_filter_group(item['path'], path_groups)
             
-            for base_path, group_info in path_groups.items():
-                # 检查文件是否在当前扫描路径下
-                if file_path.startswith(base_path):
-                    # 计算相对于基础路径的深度
-                    rel_path = os.path.relpath(file_path, base_path)
-                    depth = 0 if rel_path == '.' else rel_path.count(os.sep)
-                    
-                    # 将文件添加到对应的组
-                    group_info['files'].append({
-                        'file': file,
-                        'depth': depth
-                    })
-                    added = True
-                    break
+            # 如果不在任何需要过滤的路径下，直接添加到结果中
+            if group is None:
+                filtered_items.append(item)
+                continue
             
-            # 如果文件不在任何需要过滤的路径下，直接添加到结果中
-            if not added:
-                filtered_files.append(file)
-        
-        # 对每个组进行过滤
-        for base_path, group_info in path_groups.items():
-            max_depth = group_info['max_depth']
-            files = group_info['files']
+            max_depth, sep_count = group
+            depth = sep_count - 1 + depth_bias
             
-            # 按照用户需求过滤中间层级：
-            # 1. 保留最深层级的文件（depth == max_depth）
-            # 2. 保留超过最深层级的文件（depth > max_depth）
-            # 3. 根据max_depth决定是否保留第1层（depth == 1）：
-            #    - 如果max_depth > 2，则保留第1层
-            #    - 如果max_depth <= 2，则过滤掉第1层
-            for file_info in files:
-                depth = file_info['depth']
-                
-                # 保留的条件：
-                # 1. 最深层级的文件
-                # 2. 超过最深层级的文件
-                # 3. 根目录（depth == 0）
-                # 4. 第1层文件，但仅当max_depth > 2时
-                if depth == max_depth or depth > max_depth or depth == 0 or (depth == 1 and max_depth > 2):
-                    filtered_files.append(file_info['file'])
-                    
-                # 记录过滤情况
-                if 0 < depth < max_depth and not (depth == 1 and max_depth > 2):
-                    self.logger.debug(f"过滤掉中间层级文件: {file_info['file']['path']} (深度: {depth}, 最大深度: {max_depth})")
-        
-        return filtered_files
+            # 按照用户需求过滤中间层级，保留的条件：
+            # 1. 最深层级
+            # 2. 超过最深层级
+            # 3. 根目录（depth == 0）
+            # 4. 第1层，但仅当max_depth > 2时
+            if depth >= max_depth or depth == 0 or (depth == 1 and max_depth > 2):
+                filtered_items.append(item)
+            else:
+                self.logger.debug(f"过滤掉中间层级{'目录' if depth_bias else '文件'}: {item['path']} (深度: {depth}, 最大深度: {max_depth})")
         
-    def _filter_intermediate_folders(self):
+        return filtered_items
+    
+    def _build_filter_groups(self):
         """
-        过滤中间层级的目录
-        
-        根据用户需求：
-        1. 如果配置了扫描3层目录，那么第2层的结果应该被过滤掉
-        2. 如果配置了扫描2层目录，那么第1层的结果应该被过滤掉
+        建立需要过滤中间层级的扫描路径索引
         
         Returns:
-            list: 过滤后的大文件夹列表
+            dict: 规范化后的扫描路径 -> (最大深度, 扫描路径中的分隔符数, 在配置中的顺序)
         """
-        # 如果没有配置扫描路径或者最大深度，则不过滤
-        if not self.scan_paths:
-            return self.large_folders
-        
-        # 创建一个字典，按扫描路径分组存储文件夹
         path_groups = {}
-        for path_info in self.scan_paths:
-            base_path = path_info['path']
-            max_depth = path_info.get('max_depth', None)
-            if max_depth and max_depth > 1:  # 只有当最大深度大于1时才需要过滤
-                path_groups[base_path] = {
-                    'max_depth': max_depth,
-                    'folders': []
-                }
-        
-        # 如果没有需要过滤的路径，则直接返回原始结果
-        if not path_groups:
-            return self.large_folders
+        for path, max_depth, _ in self._scan_roots:
+            if max_depth and max_depth > 1:
+                base_path = os.path.normcase(os.path.normpath(path))
+                # 同一路径配置多次时，保留第一次出现的顺序，最大深度以最后一次为准
+                order = path_groups[base_path][2] if base_path in path_groups else len(path_groups)
+                # 去掉根目录末尾的分隔符后再计数，使 C:\ 和 C:\Users 的深度计算一致
+                path_groups[base_path] = (max_depth, base_path.rstrip(os.sep).count(os.sep), order)
+        return path_groups
+    
+    def _find_filter_group(self, path, path_groups):
+        """
+        逐级向上查找路径所属的扫描路径，查找次数只与路径层数有关
         
-        # 将文件夹按扫描路径分组
-        filtered_folders = []
-        for folder in self.large_folders:
-            folder_path = folder['path']
-            added = False
-            
-            for base_path, group_info in path_groups.items():
-                # 检查文件夹是否在当前扫描路径下
-                if folder_path.startswith(base_path):
-                    # 计算相对于基础路径的深度
-                    rel_path = os.path.relpath(folder_path, base_path)
-                    depth = 0 if rel_path == '.' else rel_path.count(os.sep) + 1
-                    
-                    # 将文件夹添加到对应的组
-                    group_info['folders'].append({
-                        'folder': folder,
-                        'depth': depth
-                    })
-                    added = True
-                    break
-            
-            # 如果文件夹不在任何需要过滤的路径下，直接添加到结果中
-            if not added:
-                filtered_folders.append(folder)
+        扫描路径相互嵌套时，与配置顺序中第一个包含该路径的扫描路径匹配，而不是最深的扫描路径
         
-        # 对每个组进行过滤
-        for base_path, group_info in path_groups.items():
-            max_depth = group_info['max_depth']
-            folders = group_info['folders']
+        Args:
+            path: 文件或文件夹路径
+            path_groups: _build_filter_groups 返回的扫描路径索引
             
-            # 按照用户需求过滤中间层级：
-            # 1. 保留最深层级的文件夹（depth == max_depth）
-            # 2. 保留超过最深层级的文件夹（depth > max_depth）
-            # 3. 根据max_depth决定是否保留第1层（depth == 1）：
-            #    - 如果max_depth > 2，则保留第1层
-            #    - 如果max_depth <= 2，则过滤掉第1层
-            for folder_info in folders:
-                depth = folder_info['depth']
-                
-                # 保留的条件：
-                # 1. 最深层级的文件夹
-                # 2. 超过最深层级的文件夹
-                # 3. 根目录（depth == 0）
-                # 4. 第1层文件夹，但仅当max_depth > 2时
-                if depth == max_depth or depth > max_depth or depth == 0 or (depth == 1 and max_depth > 2):
-                    filtered_folders.append(folder_info['folder'])
-                    
-                # 记录过滤情况
-                if 0 < depth < max_depth and not (depth == 1 and max_depth > 2):
-                    self.logger.debug(f"过滤掉中间层级目录: {folder_info['folder']['path']} (深度: {depth}, 最大深度: {max_depth})")
+        Returns:
+            tuple: (最大深度, 相对扫描路径多出的分隔符数)，不属于任何扫描路径时返回None
+        """
+        normalized = os.path.normcase(os.path.normpath(path))
+        matched = None
+        current = normalized
+        while True:
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            group = path_groups.get(parent)
+            if group is not None and (matched is None or group[2] < matched[2]):
+                matched = group
+            current = parent
         
-        return filtered_folders
+        if matched is None:
+            return None
+        max_depth, base_sep_count, _ = matched
+        return max_depth, normalized.count(os.sep) - base_sep_count
     
     def _get_current_time(self):
         """
@@ -9,11 +9,18 @@
 
 import os
 import sys
+import queue
+import atexit
 import logging
+import logging.handlers
 import ctypes
 import multiprocessing
 from pathlib import Path
 
+# 后台日志监听器，负责在独立线程中格式化并写入日志
+_log_listener = None
+_log_listener_pid = None  # 启动日志监听器的进程ID
+
 
 def is_admin():
     """
@@ -50,10 +57,19 @@ def setup_logger(log_file, log_level='INFO'):
     level = getattr(logging, log_level.upper(), logging.INFO)
     logger.setLevel(level)
     
+    global _log_listener, _log_listener_pid
+    
+    # fork方式启动的子进程会继承父进程的队列处理器，但监听线程不会被复制，
+    # 队列中的日志无人写入，需要移除继承的处理器后重新配置
+    if _log_listener is not None and _log_listener_pid != os.getpid():
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        _log_listener = None
+    
     # 防止日志重复
     if not logger.handlers:
-        # 创建文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        # 创建文件处理器，日志文件在写入第一条记录时才打开
+        file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
         file_handler.setLevel(level)
         
         # 创建控制台处理器
@@ -65,25 +81,97 @@ def setup_logger(log_file, log_level='INFO'):
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
-        # 添加处理器
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        # 日志记录只放入队列，由后台监听线程完成格式化和文件写入，
+        # 避免工作线程在每条日志上等待磁盘I/O
+        log_queue = queue.Queue(-1)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        
+        _log_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        _log_listener.start()
+        _log_listener_pid = os.getpid()
+        atexit.register(shutdown_logger)
     
     return logger
 
 
-def get_optimal_thread_count():
+def shutdown_logger():
+    """
+    停止后台日志监听器，确保队列中剩余的日志全部写入
+    """
+    global _log_listener
+    # 从父进程继承的监听器没有运行的监听线程，不能在子进程中停止
+    if _log_listener is not None and _log_listener_pid == os.getpid():
+        _log_listener.stop()
+        _log_listener = None
+
+
+def _read_cgroup_cpu_quota():
+    """
+    读取Linux cgroup中的CPU配额
+    
+    Returns:
+        int: 配额允许使用的CPU核心数，没有配额限制或无法读取时返回None
+    """
+    try:
+        # cgroup v2: "配额 周期"，不限制时配额为max
+        with open('/sys/fs/cgroup/cpu.max', 'r') as f:
+            quota, period = f.read().split()[:2]
+        if quota == 'max':
+            return None
+        quota, period = int(quota), int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: 配额为-1表示不限制
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us', 'r') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us', 'r') as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            return None
+    
+    if quota <= 0 or period <= 0:
+        return None
+    return max(1, -(-quota // period))  # 向上取整
+
+
+def get_cpu_count():
+    """
+    获取当前进程实际可用的CPU核心数，考虑CPU亲和性和容器的CPU配额
+    
+    Returns:
+        int: CPU核心数
+    """
+    try:
+        cpu_count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Windows和macOS没有sched_getaffinity
+        cpu_count = multiprocessing.cpu_count()
+    
+    if sys.platform.startswith('linux'):
+        quota = _read_cgroup_cpu_quota()
+        if quota is not None:
+            cpu_count = min(cpu_count, quota)
+    
+    return max(1, cpu_count)
+
+
+def get_optimal_thread_count(min_threads=4):
     """
     获取最优线程数
     
+    Args:
+        min_threads: 最少线程数
+    
     Returns:
         int: 线程数
     """
     # 获取CPU核心数
-    cpu_count = multiprocessing.cpu_count()
+    cpu_count = get_cpu_count()
     
     # 设置最优线程数
     # 一般设置为CPU核心数的1-2倍
     # 对于IO密集型任务，可以设置为CPU核心数的2倍
     # 对于CPU密集型任务，可以设置为CPU核心数
-    return max(4, cpu_count * 2)  # 至少4个线程
\ No newline at end of file
+    return max(min_threads, cpu_count * 2)
\ No newline at end of file